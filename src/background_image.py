@@ -0,0 +1,226 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+# Edge length (px) below which no further pyramid levels are created
+MIN_LEVEL_SIZE = 256
+# The visible region of a level is extended to multiples of the tile size, so that small pans do not change the region
+TILE_SIZE = 256
+DEFAULT_CACHE_DIRECTORY = ".background_cache"
+# Increase the version if the layout of the cached images changes to invalidate all existing entries
+CACHE_VERSION = 2
+
+# Maximum number of pyramids kept in memory by this process
+MAX_LOADED_PYRAMIDS = 4
+
+# Recently used pyramids of this process by the key of their cache entry
+_loaded_pyramids = OrderedDict()  # type: OrderedDict[str, ImagePyramid]
+_loaded_pyramids_lock = threading.Lock()
+
+
+class ImagePyramid(object):
+    """
+    Multi-resolution pyramid of an image. Level 0 is the original image, and every further level halves the
+    resolution of the previous one.
+    """
+
+    def __init__(self, levels: List[np.ndarray]):
+        """
+        :param levels: RGB images of the levels in the shape [height, width, 3], starting with the original image
+        """
+        self.levels = levels
+        self.shape = levels[0].shape[:2]
+
+    def __len__(self) -> int:
+        return len(self.levels)
+
+    def select_level(self, screen_pixels_per_image_pixel: float) -> int:
+        """
+        Select the coarsest level, which still provides at least one image pixel per screen pixel.
+        :param screen_pixels_per_image_pixel: Number of screen pixels covered by a pixel of the original image
+        :return: Index of the level
+        """
+        if screen_pixels_per_image_pixel <= 0:
+            return 0
+        level = int(np.floor(np.log2(1 / screen_pixels_per_image_pixel)))
+        return int(np.clip(level, 0, len(self.levels) - 1))
+
+    def level_scale(self, level: int) -> Tuple[float, float]:
+        """
+        :return: Tuple of (y scale, x scale) from the original image to the level
+        """
+        level_shape = self.levels[level].shape
+        return level_shape[0] / self.shape[0], level_shape[1] / self.shape[1]
+
+
+class BackgroundLayer(object):
+    """
+    Background image of an axes backed by an image pyramid. Whenever the limits or the size of the axes change, the
+    level matching the zoom is selected and only the visible region of it is drawn.
+    """
+
+    def __init__(self, ax, pyramid: ImagePyramid):
+        """
+        :param ax: Axes to draw the background on. The axes are shown in pixel coordinates of the original image
+        :param pyramid: Pyramid of the background image
+        """
+        self.ax = ax
+        self.pyramid = pyramid
+        self.region = None
+        self.image = ax.imshow(pyramid.levels[-1], extent=get_image_extent(pyramid.shape))
+        # Changing the extent of the image must not change the limits of the axes
+        ax.set_autoscale_on(False)
+
+        self.callbacks = [ax.callbacks.connect("xlim_changed", self._on_view_changed),
+                          ax.callbacks.connect("ylim_changed", self._on_view_changed)]
+        self.resize_callback = ax.figure.canvas.mpl_connect("resize_event", self._on_view_changed)
+        self.update()
+
+    def remove(self):
+        """
+        Remove the background image from the axes, e.g. to show another one.
+        """
+        for callback in self.callbacks:
+            self.ax.callbacks.disconnect(callback)
+        self.ax.figure.canvas.mpl_disconnect(self.resize_callback)
+        self.image.remove()
+
+    def update(self):
+        """
+        Select the level and visible region of the background image for the current limits of the axes.
+        """
+        x_limits, y_limits = sorted(self.ax.get_xlim()), sorted(self.ax.get_ylim())
+        screen_pixels_per_image_pixel = self.ax.bbox.width / max(x_limits[1] - x_limits[0], 1e-6)
+        level = self.pyramid.select_level(screen_pixels_per_image_pixel)
+        level_image = self.pyramid.levels[level]
+        scale_y, scale_x = self.pyramid.level_scale(level)
+
+        # Visible region of the level extended to the tile grid
+        first_column, last_column = self._tile_range(x_limits, scale_x, level_image.shape[1])
+        first_row, last_row = self._tile_range(y_limits, scale_y, level_image.shape[0])
+        region = (level, first_row, last_row, first_column, last_column)
+        if region == self.region:
+            return
+        self.region = region
+        if first_row >= last_row or first_column >= last_column:
+            self.image.set_visible(False)
+            return
+
+        self.image.set_visible(True)
+        self.image.set_data(level_image[first_row:last_row, first_column:last_column])
+        self.image.set_extent((first_column / scale_x - 0.5, last_column / scale_x - 0.5,
+                               last_row / scale_y - 0.5, first_row / scale_y - 0.5))
+
+    @staticmethod
+    def _tile_range(limits: List[float], scale: float, size: int) -> Tuple[int, int]:
+        first = int(np.floor((limits[0] + 0.5) * scale / TILE_SIZE)) * TILE_SIZE
+        last = int(np.ceil((limits[1] + 0.5) * scale / TILE_SIZE)) * TILE_SIZE
+        return int(np.clip(first, 0, size)), int(np.clip(last, 0, size))
+
+    def _on_view_changed(self, _):
+        self.update()
+
+
+def load_background_pyramid(image_file: str, use_cache: bool = True,
+                            cache_dir: Optional[str] = None) -> ImagePyramid:
+    """
+    Load the pyramid of a background image. The levels are stored in an on-disk cache keyed by the fingerprint of the
+    image file. Cached levels are memory-mapped, so that only the regions drawn are read. The most recently used
+    pyramids are kept per process, so that showing a recording again does not load its image again.
+    :param image_file: Path of the image file
+    :param use_cache: Load the pyramid from the on-disk cache if possible and store it there otherwise
+    :param cache_dir: Directory of the cache. By default, a directory next to the image file is used
+    :return: Pyramid of the RGB image
+    """
+    file_stat = os.stat(image_file)
+    fingerprint = {"version": CACHE_VERSION, "file": os.path.abspath(image_file), "size": file_stat.st_size,
+                   "mtime": file_stat.st_mtime_ns}
+    key = hashlib.blake2b(json.dumps(fingerprint, sort_keys=True).encode(), digest_size=16).hexdigest()
+    with _loaded_pyramids_lock:
+        if key in _loaded_pyramids:
+            _loaded_pyramids.move_to_end(key)
+            return _loaded_pyramids[key]
+
+    entry_dir = os.path.join(cache_dir if cache_dir is not None else
+                             os.path.join(os.path.dirname(image_file), DEFAULT_CACHE_DIRECTORY), key)
+    pyramid = _load_cached_pyramid(entry_dir) if use_cache else None
+    if pyramid is None:
+        pyramid = ImagePyramid(_create_levels(_decode_image(image_file)))
+        if use_cache and _save_cached_pyramid(entry_dir, pyramid):
+            # Use the memory-mapped levels instead of keeping the decoded image in memory
+            cached_pyramid = _load_cached_pyramid(entry_dir)
+            if cached_pyramid is not None:
+                pyramid = cached_pyramid
+
+    with _loaded_pyramids_lock:
+        _loaded_pyramids[key] = pyramid
+        while len(_loaded_pyramids) > MAX_LOADED_PYRAMIDS:
+            _loaded_pyramids.popitem(last=False)
+    return pyramid
+
+
+def get_image_extent(original_shape: Tuple[int, int]) -> Tuple[float, float, float, float]:
+    """
+    Get the extent of an image in pixel coordinates of the original image, e.g. to draw a scaled image by imshow.
+    :param original_shape: (height, width) of the original image
+    :return: Tuple of (left, right, bottom, top)
+    """
+    height, width = original_shape
+    return -0.5, width - 0.5, height - 0.5, -0.5
+
+
+def _decode_image(image_file: str) -> np.ndarray:
+    # OpenCV is only imported when an image is decoded, as importing it takes a noticeable time
+    import cv2
+
+    logger.info("Decoding background image {}", image_file)
+    image = cv2.imread(image_file)
+    if image is None:
+        raise OSError("Could not decode image {}".format(image_file))
+    return np.ascontiguousarray(image[:, :, ::-1])
+
+
+def _create_levels(image: np.ndarray) -> List[np.ndarray]:
+    import cv2
+
+    levels = [image]
+    while max(levels[-1].shape[:2]) > MIN_LEVEL_SIZE:
+        height, width = levels[-1].shape[:2]
+        levels.append(cv2.resize(levels[-1], ((width + 1) // 2, (height + 1) // 2), interpolation=cv2.INTER_AREA))
+    return levels
+
+
+def _load_cached_pyramid(entry_dir: str) -> Optional[ImagePyramid]:
+    if not os.path.isdir(entry_dir):
+        return None
+    try:
+        level_files = sorted((entry.name for entry in os.scandir(entry_dir)),
+                             key=lambda name: int(name[len("level"):-len(".npy")]))
+        levels = [np.load(os.path.join(entry_dir, level_file), mmap_mode="r") for level_file in level_files]
+    except (OSError, ValueError) as e:
+        logger.warning("Could not load cached background image from {}: {}", entry_dir, e)
+        return None
+    if not levels:
+        return None
+    return ImagePyramid(levels)
+
+
+def _save_cached_pyramid(entry_dir: str, pyramid: ImagePyramid) -> bool:
+    temporary_dir = "{}.tmp{}".format(entry_dir, os.getpid())
+    try:
+        os.makedirs(temporary_dir, exist_ok=True)
+        for i, level in enumerate(pyramid.levels):
+            np.save(os.path.join(temporary_dir, "level{}.npy".format(i)), level)
+        os.replace(temporary_dir, entry_dir)
+    except OSError as e:
+        logger.warning("Could not cache background image in {}: {}", entry_dir, e)
+        shutil.rmtree(temporary_dir, ignore_errors=True)
+        return False
+    return True
@@ -0,0 +1,78 @@
+import argparse
+import json
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from loguru import logger
+
+
+def create_args():
+    cs = argparse.ArgumentParser(description="Load test of a running frame server (see serve_frames.py)")
+    cs.add_argument('--url', default="http://127.0.0.1:8000",
+                    help="Address of the frame server.", type=str)
+    cs.add_argument('--recording', default="26",
+                    help="Name of the recording to request frames of.", type=str)
+    cs.add_argument('--first_frame', default=None,
+                    help="First requested frame. By default, the first frame of the recording.", type=int)
+    cs.add_argument('--num_frames', default=100,
+                    help="Number of different frames requested.", type=int)
+    cs.add_argument('--frame_step', default=1,
+                    help="Step between the requested frames.", type=int)
+    cs.add_argument('--format', default="png", choices=["png", "json"],
+                    help="Request rendered frames (png) or scene data (json).", type=str)
+    cs.add_argument('--concurrency', default=8,
+                    help="Number of parallel clients.", type=int)
+    cs.add_argument('--passes', default=2,
+                    help="Number of passes over the frames. The first pass fills the cache of the server.", type=int)
+    return vars(cs.parse_args())
+
+
+def request(url: str) -> float:
+    """
+    Request a url and read the whole response.
+    :return: Latency of the request in seconds
+    """
+    start = time.perf_counter()
+    with urllib.request.urlopen(url) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+def run_pass(urls: list, concurrency: int):
+    """
+    Request all urls by parallel clients and report the throughput and the latency percentiles.
+    """
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = np.array(list(executor.map(request, urls)))
+    duration = time.perf_counter() - start
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    logger.info("{} requests in {:.2f}s: {:.1f} requests/s, latency p50 {:.1f}ms, p95 {:.1f}ms, p99 {:.1f}ms, "
+                "max {:.1f}ms", len(urls), duration, len(urls) / duration, p50, p95, p99, latencies.max() * 1000)
+
+
+def main():
+    config = create_args()
+    recording_url = "{}/recording/{}".format(config["url"].rstrip("/"), config["recording"])
+
+    first_frame = config["first_frame"]
+    if first_frame is None:
+        with urllib.request.urlopen(recording_url + ".json") as response:
+            first_frame = json.load(response)["minimumFrame"]
+
+    frames = range(first_frame, first_frame + config["num_frames"] * config["frame_step"], config["frame_step"])
+    urls = ["{}/frame/{}.{}".format(recording_url, frame, config["format"]) for frame in frames]
+    for i in range(config["passes"]):
+        logger.info("Pass {} ({})", i + 1, "cold cache" if i == 0 else "warm cache")
+        try:
+            run_pass(urls, config["concurrency"])
+        except urllib.error.URLError as e:
+            logger.error("Request to {} failed: {}", config["url"], e)
+            return
+
+
+if __name__ == '__main__':
+    main()
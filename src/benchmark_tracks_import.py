@@ -0,0 +1,149 @@
+import argparse
+import timeit
+
+import numpy as np
+import pandas
+from loguru import logger
+
+from tracks_import import SEMI_COLON_LIST_COLUMNS, N_MAX_OVERLAPPING_LANELETS, parse_semi_colon_list_column, \
+    get_rotated_bbox, TrackIntervalIndex
+
+
+def create_args():
+    cs = argparse.ArgumentParser(description="Benchmark of the tracks import")
+    cs.add_argument('--tracks_file', default=None,
+                    help="Path of a tracks csv file to benchmark with. If not given, synthetic data is used.",
+                    type=str)
+    cs.add_argument('--num_rows', default=500000,
+                    help="Number of rows of the synthetic data.", type=int)
+    cs.add_argument('--track_length', default=500,
+                    help="Number of rows per track of the synthetic data.", type=int)
+    cs.add_argument('--num_tracks', default=2000,
+                    help="Number of tracks of the synthetic tracks meta used for the visualizer startup.", type=int)
+    cs.add_argument('--num_frames', default=10000,
+                    help="Number of frames of the synthetic tracks meta used for the visualizer startup.", type=int)
+    cs.add_argument('--repeat', default=3,
+                    help="Number of repetitions of every benchmark. The best run is reported.", type=int)
+    return vars(cs.parse_args())
+
+
+def semi_colon_float_list_to_list(semi_colon_list):
+    """
+    Previous per-cell converter of the tracks import, kept as reference for the benchmark.
+    """
+    output_list = [np.nan] * N_MAX_OVERLAPPING_LANELETS
+    if semi_colon_list:
+        if ";" in semi_colon_list:
+            for i, v in enumerate(semi_colon_list.split(";")):
+                output_list[i] = float(v)
+        else:
+            output_list[0] = float(semi_colon_list)
+    return output_list
+
+
+def create_synthetic_column(num_rows: int) -> pandas.Series:
+    """
+    Create a column of semicolon separated lists with one to three entries like the lanelet columns of exiD.
+    """
+    rng = np.random.default_rng(0)
+    num_entries = rng.integers(1, 4, num_rows)
+    values = np.round(rng.normal(0, 2, num_entries.sum()), 3).astype(str)
+    cells = np.split(values, np.cumsum(num_entries)[:-1])
+    return pandas.Series([";".join(cell) for cell in cells])
+
+
+def benchmark_semi_colon_lists(columns: dict, repeat: int):
+    for column, values in columns.items():
+        def per_cell():
+            return np.array([semi_colon_float_list_to_list(value) for value in values.fillna("")])
+
+        def vectorized():
+            return parse_semi_colon_list_column(values)
+
+        if not np.allclose(per_cell(), vectorized(), equal_nan=True):
+            logger.error("Parsed values of column {} differ between both parsers!", column)
+
+        time_per_cell = min(timeit.repeat(per_cell, number=1, repeat=repeat))
+        time_vectorized = min(timeit.repeat(vectorized, number=1, repeat=repeat))
+        logger.info("{} ({} rows): per-cell converter {:.3f}s, vectorized parser {:.3f}s (speedup {:.1f}x)",
+                    column, len(values), time_per_cell, time_vectorized, time_per_cell / time_vectorized)
+
+
+def benchmark_rotated_bbox(num_rows: int, track_length: int, repeat: int):
+    rng = np.random.default_rng(0)
+    x_center, y_center = rng.uniform(0, 500, num_rows), rng.uniform(-300, 0, num_rows)
+    length, width = rng.uniform(4, 5, num_rows), rng.uniform(1.5, 2, num_rows)
+    heading = rng.uniform(-np.pi, np.pi, num_rows)
+    track_starts = range(0, num_rows, track_length)
+
+    def per_track():
+        return [get_rotated_bbox(x_center[i:i + track_length], y_center[i:i + track_length],
+                                 length[i:i + track_length], width[i:i + track_length], heading[i:i + track_length])
+                for i in track_starts]
+
+    def batched(out):
+        get_rotated_bbox(x_center, y_center, length, width, heading, out=out)
+        return [out[i:i + track_length] for i in track_starts]
+
+    out_float64 = np.empty((num_rows, 4, 2))
+    out_float32 = np.empty((num_rows, 4, 2), dtype=np.float32)
+    time_per_track = min(timeit.repeat(per_track, number=1, repeat=repeat))
+    time_float64 = min(timeit.repeat(lambda: batched(out_float64), number=1, repeat=repeat))
+    time_float32 = min(timeit.repeat(lambda: batched(out_float32), number=1, repeat=repeat))
+    logger.info("Rotated bboxes ({} rows, {} rows per track): per track {:.3f}s, batched {:.3f}s (speedup {:.1f}x), "
+                "batched float32 {:.3f}s (speedup {:.1f}x)", num_rows, track_length, time_per_track, time_float64,
+                time_per_track / time_float64, time_float32, time_per_track / time_float32)
+
+
+def create_frame_to_track_idxs(tracks_meta: list) -> dict:
+    """
+    Previous frame to track mapping of the visualizer, kept as reference for the benchmark.
+    """
+    minimum_frame = min(meta["initialFrame"] for meta in tracks_meta)
+    maximum_frame = max(meta["finalFrame"] for meta in tracks_meta)
+    frame_to_track_idxs = {}
+    for i_frame in range(minimum_frame, maximum_frame + 1):
+        indices = [i_track for i_track, track_meta in enumerate(tracks_meta)
+                   if track_meta["initialFrame"] <= i_frame <= track_meta["finalFrame"]]
+        frame_to_track_idxs[i_frame] = indices
+    return frame_to_track_idxs
+
+
+def benchmark_visualizer_startup(num_tracks: int, num_frames: int, track_length: int, repeat: int):
+    rng = np.random.default_rng(0)
+    initial_frames = rng.integers(0, num_frames, num_tracks)
+    final_frames = np.minimum(initial_frames + rng.integers(1, 2 * track_length, num_tracks), num_frames - 1)
+    tracks_meta = [{"initialFrame": int(initial_frame), "finalFrame": int(final_frame)}
+                   for initial_frame, final_frame in zip(initial_frames, final_frames)]
+
+    # The previous mapping is slow, so it is only created once
+    time_dict = min(timeit.repeat(lambda: create_frame_to_track_idxs(tracks_meta), number=1, repeat=1))
+    time_interval_index = min(timeit.repeat(lambda: TrackIntervalIndex(tracks_meta), number=1, repeat=repeat))
+
+    frame_to_track_idxs = create_frame_to_track_idxs(tracks_meta)
+    interval_index = TrackIntervalIndex(tracks_meta)
+    if any(interval_index[frame].tolist() != indices for frame, indices in frame_to_track_idxs.items()):
+        logger.error("The track indices of the interval index differ from the previous mapping!")
+
+    logger.info("Frame to track mapping ({} tracks, {} frames): dict of lists {:.3f}s, interval index {:.4f}s "
+                "(speedup {:.0f}x)", num_tracks, num_frames, time_dict, time_interval_index,
+                time_dict / time_interval_index)
+
+
+def main():
+    config = create_args()
+
+    if config["tracks_file"] is not None:
+        logger.info("Loading semicolon separated columns from {}", config["tracks_file"])
+        raw_tracks = pandas.read_csv(config["tracks_file"], dtype={column: str for column in SEMI_COLON_LIST_COLUMNS})
+        columns = {column: raw_tracks[column] for column in SEMI_COLON_LIST_COLUMNS if column in raw_tracks}
+    else:
+        columns = {"synthetic": create_synthetic_column(config["num_rows"])}
+
+    benchmark_semi_colon_lists(columns, config["repeat"])
+    benchmark_rotated_bbox(config["num_rows"], config["track_length"], config["repeat"])
+    benchmark_visualizer_startup(config["num_tracks"], config["num_frames"], config["track_length"], config["repeat"])
+
+
+if __name__ == '__main__':
+    main()
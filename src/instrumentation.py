@@ -0,0 +1,199 @@
+import csv
+import functools
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional
+
+from loguru import logger
+
+# Number of recent measurements used for the moving frame rate and latency
+DEFAULT_WINDOW_SIZE = 60
+STAGE_FIELDS = ["stage", "count", "total_ms", "mean_ms", "min_ms", "max_ms", "recent_ms"]
+
+
+class StageTimer(object):
+    """
+    Statistics of the durations of a stage. Only aggregates and the latest durations are kept, so that stages measured
+    every frame do not grow in memory during long playbacks.
+    """
+
+    def __init__(self, window_size: int = DEFAULT_WINDOW_SIZE):
+        self.count = 0
+        self.total = 0.0
+        self.minimum = float("inf")
+        self.maximum = 0.0
+        self.recent = deque(maxlen=window_size)
+
+    def add(self, duration: float):
+        self.count += 1
+        self.total += duration
+        self.minimum = min(self.minimum, duration)
+        self.maximum = max(self.maximum, duration)
+        self.recent.append(duration)
+
+    def to_dict(self) -> dict:
+        """
+        :return: Dictionary of the statistics with all durations given in milliseconds
+        """
+        return {"count": self.count,
+                "total_ms": 1000 * self.total,
+                "mean_ms": 1000 * self.total / self.count if self.count else 0.0,
+                "min_ms": 1000 * self.minimum if self.count else 0.0,
+                "max_ms": 1000 * self.maximum,
+                "recent_ms": 1000 * sum(self.recent) / len(self.recent) if self.recent else 0.0}
+
+
+class Instrumentation(object):
+    """
+    Opt-in collection of per-stage timers, counters and the frame rate. While disabled, all methods return immediately,
+    so that the instrumentation points can stay in the code. Measurements of worker processes (e.g. when reading
+    recordings in a process pool) are not collected, as every process has its own instance.
+    """
+
+    def __init__(self, window_size: int = DEFAULT_WINDOW_SIZE):
+        self.enabled = False
+        self.window_size = window_size
+        self.timers = {}  # type: Dict[str, StageTimer]
+        self.counters = {}  # type: Dict[str, int]
+        self._frame_times = deque(maxlen=window_size)
+        # Stages may be measured by the background thread preparing the frames during playback
+        self._lock = threading.Lock()
+
+    def enable(self, enabled: bool = True):
+        self.enabled = enabled
+
+    def reset(self):
+        with self._lock:
+            self.timers.clear()
+            self.counters.clear()
+            self._frame_times.clear()
+
+    def record(self, stage: str, duration: float):
+        """
+        Record the duration (s) of a stage.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            if stage not in self.timers:
+                self.timers[stage] = StageTimer(self.window_size)
+            self.timers[stage].add(duration)
+
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        """
+        Measure the duration of the enclosed block as the given stage.
+        """
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def count(self, counter: str, value: int = 1):
+        """
+        Increase a counter by a value.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def tick_frame(self):
+        """
+        Mark that a frame was drawn. The frame rate is given by the time between the latest frames.
+        """
+        if not self.enabled:
+            return
+        self._frame_times.append(time.perf_counter())
+        self.count("frames")
+
+    @property
+    def fps(self) -> float:
+        frame_times = list(self._frame_times)
+        if len(frame_times) < 2 or frame_times[-1] == frame_times[0]:
+            return 0.0
+        return (len(frame_times) - 1) / (frame_times[-1] - frame_times[0])
+
+    def latency(self, stage: str) -> float:
+        """
+        Get the mean duration (ms) of the latest measurements of a stage.
+        """
+        timer = self.timers.get(stage)
+        return timer.to_dict()["recent_ms"] if timer is not None else 0.0
+
+    def summary(self) -> dict:
+        """
+        :return: Dictionary of the statistics of all stages, the counters and the current frame rate
+        """
+        with self._lock:
+            return {"stages": {stage: timer.to_dict() for stage, timer in self.timers.items()},
+                    "counters": dict(self.counters),
+                    "fps": self.fps}
+
+    def export(self, output_file: str):
+        """
+        Write the summary to a file. Files ending with ".csv" contain one row per stage followed by one row per counter,
+        all other files are written as JSON.
+        :param output_file: Path of the output file
+        """
+        summary = self.summary()
+        if output_file.lower().endswith(".csv"):
+            with open(output_file, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(STAGE_FIELDS)
+                for stage, stats in summary["stages"].items():
+                    writer.writerow([stage] + [stats[field] for field in STAGE_FIELDS[1:]])
+                writer.writerow([])
+                writer.writerow(["counter", "value"])
+                for counter, value in summary["counters"].items():
+                    writer.writerow([counter, value])
+                writer.writerow(["fps", summary["fps"]])
+        else:
+            with open(output_file, "w") as f:
+                json.dump(summary, f, indent=2)
+        logger.info("Wrote instrumentation to {}", output_file)
+
+    def log_summary(self):
+        summary = self.summary()
+        for stage, stats in summary["stages"].items():
+            logger.info("{}: {} calls, {:.1f} ms in total, {:.2f} ms on average, {:.2f} ms at most", stage,
+                        stats["count"], stats["total_ms"], stats["mean_ms"], stats["max_ms"])
+        for counter, value in summary["counters"].items():
+            logger.info("{}: {}", counter, value)
+
+
+# Instrumentation shared by all modules, which is disabled by default
+instrumentation = Instrumentation()
+
+
+def timed(stage: str) -> Callable:
+    """
+    Decorator measuring every call of a function as the given stage of the shared instrumentation.
+    """
+    def decorator(function: Callable) -> Callable:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not instrumentation.enabled:
+                return function(*args, **kwargs)
+            with instrumentation.timer(stage):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def finish_instrumentation(output_file: Optional[str] = None):
+    """
+    Log the summary of the shared instrumentation and export it, if an output file is given.
+    """
+    if not instrumentation.enabled:
+        return
+    instrumentation.log_summary()
+    if output_file is not None:
+        instrumentation.export(output_file)
@@ -0,0 +1,269 @@
+import numpy as np
+import pandas
+from loguru import logger
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from spatial_index import GridIndex
+from tracks_import import RecordingStore
+
+# Maximum center distance (m) of two objects to be considered as interacting
+DEFAULT_RADIUS = 50.0
+# Number of frames processed per task
+DEFAULT_CHUNK_SIZE = 1000
+# Radius (m) of objects without a bounding box (e.g. pedestrians) used for the time to collision
+DEFAULT_OBJECT_RADIUS = 0.5
+# Edge length (m) of the grid cells used as conflict areas for the post encroachment time
+DEFAULT_PET_CELL_SIZE = 1.0
+# Maximum post encroachment time (s) to be reported
+DEFAULT_MAX_PET = 5.0
+
+EVENT_COLUMNS = ["trackIndex1", "trackIndex2", "firstFrame", "lastFrame", "numFrames", "minDistance",
+                 "minDistanceFrame", "minTTC", "minTTCFrame"]
+PAIR_COLUMNS = ["trackIndex1", "trackIndex2"]
+
+# Tracks of the worker processes, which are transferred once per process instead of once per task
+_worker_tracks = None
+
+
+def compute_interactions(tracks: RecordingStore, recording_meta: dict,
+                         frame_range: Optional[Tuple[int, int]] = None, radius: float = DEFAULT_RADIUS,
+                         frame_step: int = 1, include_pet: bool = True, workers: int = 1,
+                         chunk_size: int = DEFAULT_CHUNK_SIZE) -> pandas.DataFrame:
+    """
+    Compute surrogate safety metrics between all pairs of road users of a recording. For every frame, the candidate
+    pairs are found by a spatial index, and the metrics of all candidate pairs of a chunk of frames are computed at
+    once. The results are aggregated to one interaction event per pair of tracks.
+    :param tracks: Tracks of a recording. Needs the columns xCenter, yCenter, xVelocity and yVelocity
+    :param recording_meta: Loaded meta of the corresponding recording
+    :param frame_range: Only consider the frames within this range given as (first frame, last frame)
+    :param radius: Maximum center distance (m) of two objects to be considered as interacting
+    :param frame_step: Only consider every nth frame
+    :param include_pet: Add the post encroachment time of each pair (see compute_post_encroachment_times)
+    :param workers: Number of processes used to process the chunks in parallel. If None, one process per CPU is used
+    :param chunk_size: Number of frames processed per task
+    :return: Table with one row per pair of interacting tracks containing the track ids, the first and last frame
+             within the radius, the minimum distance (m) between the bounding boxes, the minimum time to collision (s)
+             and optionally the post encroachment time (s) including the frames these minima were reached
+    """
+    frame_index = tracks.frame_index()
+    first_frame, last_frame = frame_range if frame_range is not None else \
+        (frame_index.minimum_frame, frame_index.maximum_frame)
+    chunks = [(start, min(start + chunk_size * frame_step - 1, last_frame), frame_step, radius)
+              for start in range(first_frame, last_frame + 1, chunk_size * frame_step)]
+
+    if workers == 1:
+        chunk_events = [compute_chunk_events(tracks, *chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(tracks,)) as executor:
+            chunk_events = list(executor.map(_compute_worker_chunk_events, chunks))
+    events = aggregate_events(pandas.concat(chunk_events, ignore_index=True)) if chunk_events else \
+        pandas.DataFrame(columns=EVENT_COLUMNS)
+    logger.info("Found {} interacting pairs of tracks in {} frames", len(events), last_frame - first_frame + 1)
+
+    if include_pet:
+        pets = compute_post_encroachment_times(tracks, recording_meta["frameRate"], frame_range)
+        events = events.merge(pets, on=PAIR_COLUMNS, how="outer")
+
+    # Replace the track indices of the store by the track ids
+    for i in (1, 2):
+        track_indices = events.pop("trackIndex{}".format(i)).to_numpy(dtype=np.int64)
+        events.insert(i - 1, "trackId{}".format(i), tracks.track_ids[track_indices])
+    return events.sort_values(["trackId1", "trackId2"], ignore_index=True)
+
+
+def _init_worker(tracks: RecordingStore):
+    global _worker_tracks
+    _worker_tracks = tracks
+
+
+def _compute_worker_chunk_events(chunk: Tuple[int, int, int, float]) -> pandas.DataFrame:
+    return compute_chunk_events(_worker_tracks, *chunk)
+
+
+def compute_chunk_events(tracks: RecordingStore, first_frame: int, last_frame: int,
+                         frame_step: int = 1, radius: float = DEFAULT_RADIUS) -> pandas.DataFrame:
+    """
+    Compute the interaction events of all pairs within a radius for a range of frames.
+    :return: Table of interaction events aggregated over the frames (see EVENT_COLUMNS)
+    """
+    frame_index = tracks.frame_index()
+    centers = frame_index.column("center")
+
+    # Collect the candidate pairs of all frames as rows of the frame-major columns
+    pairs = []
+    for frame in range(first_frame, last_frame + 1, frame_step):
+        rows = frame_index.frame_rows(frame)
+        if rows.stop - rows.start < 2:
+            continue
+        grid = GridIndex(centers[rows], cell_size=radius)
+        pairs.append(grid.query_pairs(radius) + rows.start)
+    pairs = np.concatenate(pairs) if pairs else np.empty((0, 2), dtype=np.int64)
+    first_rows, second_rows = pairs[:, 0], pairs[:, 1]
+
+    first_polygons, first_radius = _get_object_shapes(tracks, first_rows)
+    second_polygons, second_radius = _get_object_shapes(tracks, second_rows)
+    velocities = np.stack([frame_index.column("xVelocity"), frame_index.column("yVelocity")], axis=-1)
+    distance = polygon_distance(first_polygons, second_polygons)
+    ttc = time_to_collision(centers[second_rows] - centers[first_rows],
+                            velocities[second_rows] - velocities[first_rows], first_radius + second_radius)
+
+    track_indices = frame_index.track_indices
+    frames = frame_index.column("frame")[first_rows]
+    events = pandas.DataFrame({"trackIndex1": track_indices[first_rows], "trackIndex2": track_indices[second_rows],
+                               "firstFrame": frames, "lastFrame": frames, "numFrames": 1,
+                               "minDistance": distance, "minDistanceFrame": frames,
+                               "minTTC": ttc, "minTTCFrame": frames}, columns=EVENT_COLUMNS)
+    return aggregate_events(events)
+
+
+def _get_object_shapes(tracks: RecordingStore, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Get the shapes of objects given by rows of the frame-major columns. Objects with a bbox are represented by their
+    bbox and the circle around it, all other objects (e.g. pedestrians) by their center and DEFAULT_OBJECT_RADIUS.
+    :return: Polygons in the shape [num_rows, 4, 2] and radius of the circles [num_rows]
+    """
+    frame_index = tracks.frame_index()
+    polygons = np.repeat(frame_index.column("center")[rows, np.newaxis, :], 4, axis=1)
+    radius = np.full(len(rows), DEFAULT_OBJECT_RADIUS)
+    if "bbox" in tracks.derived_columns or "bbox" in tracks.columns:
+        # Accessing the column calculates the bboxes and sets the mask of the tracks, which have a bbox
+        bboxes = frame_index.column("bbox")
+        track_mask = tracks.track_masks.get("bbox")
+        has_bbox = track_mask[frame_index.track_indices[rows]] if track_mask is not None else \
+            np.ones(len(rows), dtype=bool)
+        bbox_rows = rows[has_bbox]
+        polygons[has_bbox] = bboxes[bbox_rows]
+        radius[has_bbox] = 0.5 * np.hypot(frame_index.column("length")[bbox_rows],
+                                          frame_index.column("width")[bbox_rows])
+    return polygons, radius
+
+
+def aggregate_events(events: pandas.DataFrame) -> pandas.DataFrame:
+    """
+    Aggregate interaction events to one event per pair of tracks. As the aggregation of events results in events,
+    the events of several chunks can be aggregated again.
+    """
+    grouped = events.groupby(PAIR_COLUMNS, sort=False)
+    aggregated = pandas.DataFrame({"firstFrame": grouped["firstFrame"].min(),
+                                   "lastFrame": grouped["lastFrame"].max(),
+                                   "numFrames": grouped["numFrames"].sum()})
+    # Take the row with the minimum value of each pair. Missing values are sorted last
+    for column in ("minDistance", "minTTC"):
+        minima = events.sort_values(column, kind="stable").drop_duplicates(PAIR_COLUMNS)
+        aggregated = aggregated.join(minima.set_index(PAIR_COLUMNS)[[column, column + "Frame"]])
+    return aggregated.reset_index()[EVENT_COLUMNS]
+
+
+def polygon_distance(first_polygons: np.ndarray, second_polygons: np.ndarray) -> np.ndarray:
+    """
+    Calculate the distance between pairs of convex polygons, e.g. rotated bboxes. Polygons, whose corners all equal
+    the same point, are treated as points.
+    :param first_polygons: Corners of the first polygons in the shape [num_pairs, num_corners, 2]
+    :param second_polygons: Corners of the second polygons in the shape [num_pairs, num_corners, 2]
+    :return: Distance between the polygons, which is 0 for overlapping polygons [num_pairs]
+    """
+    distance = np.minimum(_corner_edge_distance(first_polygons, second_polygons),
+                          _corner_edge_distance(second_polygons, first_polygons))
+    distance[_polygons_overlap(first_polygons, second_polygons)] = 0
+    return distance
+
+
+def _corner_edge_distance(corners: np.ndarray, polygons: np.ndarray) -> np.ndarray:
+    """
+    Minimum distance between the corners of the first polygons and the edges of the second polygons
+    """
+    starts = polygons[:, np.newaxis, :, :]
+    edges = np.roll(polygons, -1, axis=1)[:, np.newaxis, :, :] - starts
+    points = corners[:, :, np.newaxis, :] - starts
+    edge_length_squared = np.sum(edges ** 2, axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t = np.clip(np.sum(points * edges, axis=-1) / edge_length_squared, 0, 1)
+    t = np.where(edge_length_squared == 0, 0, t)
+    closest = points - t[..., np.newaxis] * edges
+    return np.hypot(closest[..., 0], closest[..., 1]).min(axis=(1, 2))
+
+
+def _polygons_overlap(first_polygons: np.ndarray, second_polygons: np.ndarray) -> np.ndarray:
+    """
+    Test if pairs of convex polygons overlap by the separating axis theorem. Degenerated edges are ignored as axes.
+    """
+    overlap = np.ones(len(first_polygons), dtype=bool)
+    has_axis = np.zeros(len(first_polygons), dtype=bool)
+    for polygons in (first_polygons, second_polygons):
+        edges = np.roll(polygons, -1, axis=1) - polygons
+        normals = np.stack([-edges[..., 1], edges[..., 0]], axis=-1)
+        valid_axes = np.any(normals != 0, axis=-1)
+        first_projections = np.einsum("pcd,pad->pac", first_polygons, normals)
+        second_projections = np.einsum("pcd,pad->pac", second_polygons, normals)
+        separated = (first_projections.max(axis=-1) < second_projections.min(axis=-1)) | \
+                    (second_projections.max(axis=-1) < first_projections.min(axis=-1))
+        overlap &= ~np.any(separated & valid_axes, axis=1)
+        has_axis |= np.any(valid_axes, axis=1)
+    return overlap & has_axis
+
+
+def time_to_collision(relative_position: np.ndarray, relative_velocity: np.ndarray,
+                      collision_distance: np.ndarray) -> np.ndarray:
+    """
+    Calculate the time to collision assuming constant velocities. Two objects collide, when the distance between their
+    centers falls below the collision distance (i.e. the objects are approximated by circles).
+    :param relative_position: Position of the second object relative to the first one [num_pairs, 2]
+    :param relative_velocity: Velocity of the second object relative to the first one [num_pairs, 2]
+    :param collision_distance: Distance of the centers at the collision [num_pairs]
+    :return: Time to collision (s), which is 0 for already colliding objects and NaN, if the objects do not collide
+    """
+    a = np.sum(relative_velocity ** 2, axis=-1)
+    b = 2 * np.sum(relative_position * relative_velocity, axis=-1)
+    c = np.sum(relative_position ** 2, axis=-1) - collision_distance ** 2
+    discriminant = b ** 2 - 4 * a * c
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ttc = (-b - np.sqrt(discriminant)) / (2 * a)
+    # Only approaching objects, whose paths come close enough, collide
+    ttc[(a == 0) | (discriminant < 0) | (b >= 0)] = np.nan
+    ttc[c <= 0] = 0
+    return ttc
+
+
+def compute_post_encroachment_times(tracks: RecordingStore, frame_rate: float,
+                                    frame_range: Optional[Tuple[int, int]] = None,
+                                    cell_size: float = DEFAULT_PET_CELL_SIZE,
+                                    max_pet: float = DEFAULT_MAX_PET) -> pandas.DataFrame:
+    """
+    Compute the post encroachment time (PET) between pairs of tracks. The conflict areas are given by the cells of a
+    grid: whenever the center of an object enters a cell after the center of another object left it, the time in
+    between is a PET of both objects. Only consecutive occupants of a cell are compared, so that following objects
+    (e.g. vehicles on the same lane) have a PET as well.
+    :param tracks: Tracks of a recording
+    :param frame_rate: Frame rate of the recording
+    :param frame_range: Only consider the frames within this range given as (first frame, last frame)
+    :param cell_size: Edge length (m) of the grid cells
+    :param max_pet: Maximum PET (s) to be reported
+    :return: Table with the minimum PET (s) of each pair of tracks and the frame the second object entered the cell
+    """
+    frames = tracks.columns["frame"]
+    row_track_indices = np.repeat(np.arange(len(tracks)), np.diff(tracks.offsets))
+    cells = np.floor(tracks.column("center") / cell_size)
+    valid = np.isfinite(cells).all(axis=1)
+    if frame_range is not None:
+        valid &= (frames >= frame_range[0]) & (frames <= frame_range[1])
+    cells, frames, row_track_indices = cells[valid].astype(np.int64), frames[valid], row_track_indices[valid]
+
+    # Find the first and last frame every track occupies a cell
+    occupancy = pandas.DataFrame({"cellX": cells[:, 0], "cellY": cells[:, 1], "trackIndex": row_track_indices,
+                                  "frame": frames})
+    occupancy = occupancy.groupby(["cellX", "cellY", "trackIndex"])["frame"].agg(["min", "max"]).reset_index()
+    occupancy = occupancy.sort_values(["cellX", "cellY", "min"], kind="stable", ignore_index=True)
+
+    # Compare consecutive occupants of every cell
+    same_cell = (occupancy["cellX"].to_numpy()[1:] == occupancy["cellX"].to_numpy()[:-1]) & \
+                (occupancy["cellY"].to_numpy()[1:] == occupancy["cellY"].to_numpy()[:-1])
+    track_indices = occupancy["trackIndex"].to_numpy()
+    entry_frames = occupancy["min"].to_numpy()
+    pet_frames = entry_frames[1:] - occupancy["max"].to_numpy()[:-1]
+    valid = same_cell & (track_indices[1:] != track_indices[:-1]) & (pet_frames <= max_pet * frame_rate)
+    pets = pandas.DataFrame({"trackIndex1": np.minimum(track_indices[:-1], track_indices[1:])[valid],
+                             "trackIndex2": np.maximum(track_indices[:-1], track_indices[1:])[valid],
+                             "pet": np.maximum(pet_frames[valid], 0) / frame_rate,
+                             "petFrame": entry_frames[1:][valid]})
+    return pets.sort_values("pet", kind="stable").drop_duplicates(PAIR_COLUMNS).reset_index(drop=True)
@@ -0,0 +1,110 @@
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+# Weight of the latest frame time in its moving average
+FRAME_TIME_SMOOTHING = 0.2
+
+
+class PlaybackScheduler(object):
+    """
+    Scheduler of the frames shown during playback, which holds a target playback rate relative to the real time of the
+    recording. Instead of stepping by a fixed number of frames, the next frame is chosen by the elapsed wall-clock
+    time, so that frames are skipped automatically when drawing takes longer. The data needed to draw the next frames
+    is prepared in a background thread while the current frame is drawn.
+    """
+
+    def __init__(self, prepare_frame: Callable[[int], Any], frame_rate: float, playback_rate: float,
+                 minimum_frame: int, maximum_frame: int, num_prefetch: int = 4):
+        """
+        :param prepare_frame: Function preparing the data to draw a frame, which is called in a background thread.
+                              Must not change the state of the visualizer
+        :param frame_rate: Frame rate of the recording
+        :param playback_rate: Target playback rate as multiple of the real time (e.g. 2 for twice the real time)
+        :param minimum_frame: First frame of the recording
+        :param maximum_frame: Last frame of the recording
+        :param num_prefetch: Number of frames prepared in advance
+        """
+        self.prepare_frame = prepare_frame
+        self.frames_per_second = frame_rate * playback_rate
+        self.minimum_frame = minimum_frame
+        self.maximum_frame = maximum_frame
+        self.num_prefetch = num_prefetch
+
+        # Current number of frames skipped per drawn frame and moving average of the time (s) per drawn frame
+        self.frame_step = 1
+        self.frame_time = 0.0
+        self._start_time = None
+        self._start_frame = None
+        self._last_time = None
+        self._prepared = {}  # type: Dict[int, Future]
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    @property
+    def frame_interval(self) -> float:
+        """
+        :return: Time (ms) between two frames at the target playback rate
+        """
+        return 1000 / self.frames_per_second
+
+    def start(self, frame: int):
+        """
+        Start (or restart) the playback at a frame, e.g. after the playback was paused or jumped to another frame.
+        """
+        self._start_time = time.perf_counter()
+        self._start_frame = frame
+        self._last_time = None
+        self.frame_step = 1
+        self._prefetch(frame)
+
+    def next_frame(self, frame: int) -> int:
+        """
+        Get the frame to draw after the given frame. The frame is chosen so that the playback reaches the target rate
+        at the time the frame is expected to be shown. If drawing is faster than the target rate, the given frame is
+        returned until the next frame is due, so that the playback never runs ahead of the target rate.
+        :param frame: Frame drawn last
+        :return: Next frame to draw, which is at most the maximum frame
+        """
+        now = time.perf_counter()
+        if self._start_time is None:
+            self.start(frame)
+        if self._last_time is not None:
+            self.frame_time += FRAME_TIME_SMOOTHING * ((now - self._last_time) - self.frame_time)
+        self._last_time = now
+
+        target_frame = self._start_frame + (now + self.frame_time - self._start_time) * self.frames_per_second
+        if target_frame < frame + 1:
+            return frame
+        next_frame = min(int(round(target_frame)), self.maximum_frame)
+        self.frame_step = max(next_frame - frame, 1)
+        self._prefetch(next_frame)
+        return next_frame
+
+    def prepared_frame(self, frame: int) -> Any:
+        """
+        Get the prepared data of a frame. If the frame was not prepared in advance, it is prepared now.
+        """
+        future = self._prepared.pop(frame, None)
+        # Frames before the requested one are not needed anymore
+        for stale_frame in [f for f in self._prepared if f < frame]:
+            self._prepared.pop(stale_frame).cancel()
+        if future is not None and not future.cancelled():
+            return future.result()
+        return self.prepare_frame(frame)
+
+    def close(self):
+        for future in self._prepared.values():
+            future.cancel()
+        self._prepared.clear()
+        self._executor.shutdown(wait=False)
+
+    def _prefetch(self, frame: int):
+        """
+        Prepare the frames expected to be drawn after the given frame, assuming the current frame step.
+        """
+        for i in range(1, self.num_prefetch + 1):
+            prefetch_frame = frame + i * self.frame_step
+            if prefetch_frame > self.maximum_frame:
+                break
+            if prefetch_frame not in self._prepared:
+                self._prepared[prefetch_frame] = self._executor.submit(self.prepare_frame, prefetch_frame)
@@ -0,0 +1,191 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, Dict, List, NamedTuple, Optional
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    # Not imported at runtime, as the importer imports pandas, which would delay opening the window
+    from tracks_import import RecordingStore
+
+DEFAULT_MEMORY_BUDGET = 4 * 1024 ** 3
+DEFAULT_NUM_PRELOAD = 1
+
+
+class LoadedRecording(NamedTuple):
+    tracks: "RecordingStore"
+    tracks_meta: List[dict]
+    recording_meta: dict
+    background_image_path: Optional[str]
+
+
+class RecordingSession(object):
+    """
+    Set of recordings, between which the visualizer can switch at runtime. The recently used recordings are kept in
+    memory as long as they fit into a memory budget, and the neighbours of the current recording are loaded in a
+    background thread, so that switching to the next or previous recording does not wait for loading it.
+    """
+
+    def __init__(self, load_recording: Callable[[str], LoadedRecording], recordings: List[str],
+                 memory_budget: int = DEFAULT_MEMORY_BUDGET, num_preload: int = DEFAULT_NUM_PRELOAD,
+                 on_evict: Optional[Callable[[str], None]] = None):
+        """
+        :param load_recording: Function loading a recording by its name, which is called in a background thread
+        :param recordings: Names of the recordings of the session in their order
+        :param memory_budget: Maximum size (bytes) of the tracks of all kept recordings. The current recording is kept
+                              even if it exceeds the budget on its own
+        :param num_preload: Number of recordings preloaded before and after the current recording
+        :param on_evict: Function called with the name of every recording removed from the session, e.g. to release
+                         other references to it
+        """
+        self.load_recording = load_recording
+        self.recordings = list(recordings)
+        self.memory_budget = memory_budget
+        self.num_preload = num_preload
+        self.on_evict = on_evict
+        self.current = None
+
+        self._loaded = OrderedDict()  # type: OrderedDict[str, LoadedRecording]
+        self._pending = {}  # type: Dict[str, Future]
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def neighbor(self, recording: str, offset: int) -> Optional[str]:
+        """
+        Get the recording at an offset from a recording in the order of the session.
+        :return: Name of the recording or None, if the offset leaves the session
+        """
+        if recording not in self.recordings:
+            return None
+        i = self.recordings.index(recording) + offset
+        return self.recordings[i] if 0 <= i < len(self.recordings) else None
+
+    def get(self, recording: str) -> LoadedRecording:
+        """
+        Get a recording and make it the current one. The recording is loaded, if it is neither kept nor preloaded yet.
+        Afterwards, the neighbours of the recording are preloaded.
+        :param recording: Name of the recording
+        :return: The loaded recording
+        """
+        loaded = self._get_loaded(recording)
+        self.current = recording
+        self._evict()
+        self.preload_neighbors(recording)
+        return loaded
+
+    def lookup(self, recording: str) -> LoadedRecording:
+        """
+        Get a recording without making it the current one or preloading its neighbours, e.g. to answer concurrent
+        requests of several recordings. The recording is loaded, if it is neither kept nor preloaded yet.
+        :param recording: Name of the recording
+        :return: The loaded recording
+        """
+        loaded = self._get_loaded(recording)
+        self._evict(keep=recording)
+        return loaded
+
+    def load_async(self, recording: str) -> Future:
+        """
+        Load a recording in the background without making it the current one, e.g. to wait for it without blocking the
+        window. Call get afterwards to make it the current one.
+        :param recording: Name of the recording
+        :return: Future of the loaded recording, which is already done if the recording is kept
+        """
+        with self._lock:
+            loaded = self._loaded.get(recording)
+            future = self._pending.get(recording)
+            if loaded is None and future is None:
+                future = self._executor.submit(self._preload, recording)
+                self._pending[recording] = future
+        if loaded is not None:
+            future = Future()
+            future.set_result(loaded)
+        return future
+
+    def preload_neighbors(self, recording: str):
+        """
+        Load the recordings before and after a recording in the background, unless they are kept or pending already.
+        """
+        for distance in range(1, self.num_preload + 1):
+            for neighbor in (self.neighbor(recording, distance), self.neighbor(recording, -distance)):
+                if neighbor is None:
+                    continue
+                with self._lock:
+                    if neighbor in self._loaded or neighbor in self._pending:
+                        continue
+                    self._pending[neighbor] = self._executor.submit(self._preload, neighbor)
+
+    def close(self):
+        with self._lock:
+            for future in self._pending.values():
+                future.cancel()
+            self._pending.clear()
+        self._executor.shutdown(wait=False)
+
+    def _get_loaded(self, recording: str) -> LoadedRecording:
+        """
+        Get a kept recording or load it. Concurrent calls for the same recording wait for a single load.
+        """
+        with self._lock:
+            loaded = self._loaded.get(recording)
+            if loaded is not None:
+                self._loaded.move_to_end(recording)
+                return loaded
+            future = self._pending.get(recording)
+            owner = future is None
+            if owner:
+                future = Future()
+                # A running future cannot be cancelled by close, as the result is set below in any case
+                future.set_running_or_notify_cancel()
+                self._pending[recording] = future
+        if not owner:
+            return future.result()
+
+        try:
+            loaded = self._load(recording)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        future.set_result(loaded)
+        return loaded
+
+    def _preload(self, recording: str) -> LoadedRecording:
+        loaded = self._load(recording)
+        # Keep the loaded recording, so that it does not need to be loaded again when it is requested
+        self._evict(keep=recording)
+        return loaded
+
+    def _load(self, recording: str) -> LoadedRecording:
+        try:
+            loaded = self.load_recording(recording)
+        except Exception:
+            logger.exception("Could not load recording {}.", recording)
+            with self._lock:
+                self._pending.pop(recording, None)
+            raise
+        # Add the recording before removing it from the pending ones, so that it is always found by get
+        with self._lock:
+            self._loaded[recording] = loaded
+            self._pending.pop(recording, None)
+        return loaded
+
+    def _evict(self, keep: Optional[str] = None):
+        """
+        Remove the least recently used recordings until the kept recordings fit into the memory budget.
+        :param keep: Recording, which is kept in addition to the current one
+        """
+        evicted = []
+        with self._lock:
+            size = sum(loaded.tracks.nbytes for loaded in self._loaded.values())
+            for recording in list(self._loaded):
+                if size <= self.memory_budget:
+                    break
+                if recording in (self.current, keep):
+                    continue
+                logger.info("Removing least recently used recording {} from the session", recording)
+                size -= self._loaded.pop(recording).tracks.nbytes
+                evicted.append(recording)
+        if self.on_evict is not None:
+            for recording in evicted:
+                self.on_evict(recording)
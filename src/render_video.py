@@ -0,0 +1,117 @@
+import matplotlib
+# Render without a display. Needs to be selected before pyplot is used
+matplotlib.use('agg')
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import matplotlib.pyplot as plt
+from loguru import logger
+
+from instrumentation import instrumentation, finish_instrumentation
+from run_track_visualization import create_parser, get_background_image_path, read_recording
+from track_visualizer import TrackVisualizer, DataError
+
+# Visualizer of the worker processes, which is created once per process
+_worker_visualizer = None
+
+
+def create_args():
+    cs = create_parser(description="Render recordings of the dataset to videos")
+    cs.add_argument('--recordings', default=None, nargs="+",
+                    help="Names of several recordings to render one after another. Overrides --recording.", type=str)
+    cs.add_argument('--output_dir', default="../output/",
+                    help="Directory to write the videos to. Each video is named by its recording.", type=str)
+    cs.add_argument('--frame_range', default=None, nargs=2,
+                    help="First and last frame to render. By default, the whole recording is rendered.", type=int)
+    cs.add_argument('--fps', default=None,
+                    help="Frame rate of the videos. By default, the frame rate of the recording divided by the "
+                         "playback speed is used, so that the videos play in real time.", type=float)
+    cs.add_argument('--dpi', default=100,
+                    help="Resolution of the rendered figure in dots per inch.", type=int)
+    cs.add_argument('--workers', default=1,
+                    help="Number of processes rendering the frames in parallel.", type=int)
+    cs.add_argument('--chunk_size', default=50,
+                    help="Number of frames rendered per task of a worker process.", type=int)
+    return vars(cs.parse_args())
+
+
+def main():
+    config = create_args()
+    recordings = config["recordings"] if config["recordings"] is not None else [config["recording"]]
+    os.makedirs(config["output_dir"], exist_ok=True)
+    instrumentation.enable(config["instrumentation"])
+
+    for recording in recordings:
+        output_file = os.path.join(config["output_dir"], "{:02d}.mp4".format(int(recording)))
+        try:
+            render_video(config, recording, output_file)
+        except DataError:
+            logger.error("Could not render recording {}. Skipping the recording.", recording)
+    finish_instrumentation(config["instrumentation_file"])
+
+
+def render_video(config: dict, recording: str, output_file: str):
+    """
+    Render a recording to a video file. The frames are split into chunks, which are rendered by a pool of worker
+    processes, and written to the video in their original order.
+    :param config: Options as given by the command-line options
+    :param recording: Name of the recording given by a number
+    :param output_file: Path of the video file
+    """
+    tracks, tracks_meta, recording_meta = read_recording(config, recording)
+    config = dict(config, recording=recording, background_image_path=get_background_image_path(config, recording))
+    visualizer = TrackVisualizer(config, tracks, tracks_meta, recording_meta, headless=True)
+    visualizer.fig.set_dpi(config["dpi"])
+
+    first_frame, last_frame = config["frame_range"] if config["frame_range"] is not None else \
+        (visualizer.minimum_frame, visualizer.maximum_frame)
+    frames = list(range(first_frame, last_frame + 1, config["playback_speed"]))
+    chunks = [frames[i:i + config["chunk_size"]] for i in range(0, len(frames), config["chunk_size"])]
+    fps = config["fps"] if config["fps"] is not None else recording_meta["frameRate"] / config["playback_speed"]
+
+    # Render the first frame in this process to determine the size of the video
+    height, width = visualizer.render_frame(first_frame).shape[:2]
+    video_writer = cv2.VideoWriter(output_file, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    logger.info("Rendering {} frames of recording {} to {}", len(frames), recording, output_file)
+
+    try:
+        if config["workers"] == 1:
+            for chunk in chunks:
+                _write_frames(video_writer, [visualizer.render_frame(frame) for frame in chunk])
+        else:
+            with ProcessPoolExecutor(max_workers=config["workers"], initializer=_init_worker,
+                                     initargs=(config, tracks, tracks_meta, recording_meta)) as executor:
+                # Limit the number of pending chunks, so that rendered frames do not pile up in memory
+                pending = deque()
+                for chunk in chunks:
+                    pending.append(executor.submit(_render_worker_frames, chunk))
+                    if len(pending) >= 2 * config["workers"]:
+                        _write_frames(video_writer, pending.popleft().result())
+                while pending:
+                    _write_frames(video_writer, pending.popleft().result())
+    finally:
+        video_writer.release()
+        plt.close(visualizer.fig)
+    logger.info("Wrote video {}", output_file)
+
+
+def _init_worker(config: dict, tracks, tracks_meta: list, recording_meta: dict):
+    global _worker_visualizer
+    _worker_visualizer = TrackVisualizer(config, tracks, tracks_meta, recording_meta, headless=True)
+    _worker_visualizer.fig.set_dpi(config["dpi"])
+
+
+def _render_worker_frames(frames: list) -> list:
+    return [_worker_visualizer.render_frame(frame) for frame in frames]
+
+
+def _write_frames(video_writer: cv2.VideoWriter, images: list):
+    for image in images:
+        video_writer.write(cv2.cvtColor(image, cv2.COLOR_RGB2BGR))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,26 @@
+import time
+
+# Measure the startup from the first import, as importing the dependencies takes a noticeable share of it
+START_TIME = time.perf_counter()
+
 import argparse
+import functools
+import glob
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 from loguru import logger
 
-from track_visualizer import TrackVisualizer, DataError
-from tracks_import import read_from_csv
+from instrumentation import instrumentation, finish_instrumentation
 
 
 def create_args():
-    cs = argparse.ArgumentParser(description="Dataset Tracks Visualizer")
+    return vars(create_parser().parse_args())
+
+
+def create_parser(description: str = "Dataset Tracks Visualizer") -> argparse.ArgumentParser:
+    cs = argparse.ArgumentParser(description=description)
     # --- Input ---
     cs.add_argument('--dataset_dir', default="../data/",
                     help="Path to directory that contains the dataset csv files.", type=str)
@@ -20,12 +31,26 @@ def create_args():
                     help="Name of the recording given by a number with a leading zero.", type=str)
     cs.add_argument('--visualizer_params_dir', default="../data/visualizer_params/",
                     help="Name of the recording given by a number with a leading zero.", type=str)
+    cs.add_argument('--use_cache', default=True,
+                    help="Cache the parsed tracks on disk to speed up loading the recording the next time.",
+                    type=str2bool)
+    cs.add_argument('--cache_dir', default=None,
+                    help="Directory of the tracks cache. By default, a directory next to the dataset csv files is used.",
+                    type=str)
+    cs.add_argument('--max_cache_size', default=8.0,
+                    help="Maximum size (GB) of the tracks cache. Least recently used entries are removed first.",
+                    type=float)
 
     # --- Visualization settings ---
     cs.add_argument('--playback_speed', default=4,
                     help="During playback, only consider every nth frame. This option also applies to the outer"
                          "backward/forward jump buttons.",
                     type=int)
+    cs.add_argument('--playback_rate', default=None,
+                    help="Target playback rate as multiple of the real time (e.g. 1, 2 or 4). During playback, frames "
+                         "are skipped automatically to hold this rate. If not given, every nth frame is shown as "
+                         "given by the playback speed. Needs the pooled rendering.",
+                    type=float)
     cs.add_argument('--suppress_track_window', default=False,
                     help="Do not show the track window when clicking on a track. Only surrounding vehicle colors are"
                          " displayed.",
@@ -58,23 +83,135 @@ def create_args():
     cs.add_argument('--annotate_age', default=False,
                     help="Annotate every track by its current age.",
                     type=str2bool)
+    cs.add_argument('--pooled_rendering', default=True,
+                    help="Keep the drawn artists between frames and only update them, which speeds up the playback.",
+                    type=str2bool)
+    cs.add_argument('--level_of_detail', default=True,
+                    help="When zoomed out, draw the objects as dots without annotations and orientation triangles. "
+                         "Needs the pooled rendering.",
+                    type=str2bool)
     cs.add_argument('--show_maximized', default=False,
                     help="Show the track Visualizer maximized. Might affect performance.",
                     type=str2bool)
 
-    return vars(cs.parse_args())
+    # --- Instrumentation ---
+    cs.add_argument('--instrumentation', default=False,
+                    help="Measure the time of the loading stages and of every drawn frame. A summary is logged when "
+                         "the visualizer is closed.",
+                    type=str2bool)
+    cs.add_argument('--instrumentation_file', default=None,
+                    help="File to export the measurements to when the visualizer is closed. Files ending with .csv "
+                         "are written as CSV, all others as JSON. Needs the instrumentation.",
+                    type=str)
+    cs.add_argument('--show_frame_stats', default=False,
+                    help="Show the frame rate and the time to update a frame next to the frame number. Needs the "
+                         "instrumentation.",
+                    type=str2bool)
+
+    # --- Session ---
+    cs.add_argument('--session', default=False,
+                    help="Allow to switch between all recordings of the dataset directory at runtime, starting with "
+                         "the given recording. Use page up/down or the recording textbox to switch.",
+                    type=str2bool)
+    cs.add_argument('--session_memory', default=4.0,
+                    help="Maximum memory (GB) of the recordings kept in memory during a session.",
+                    type=float)
+
+    return cs
 
 
 def main():
     config = create_args()
 
-    dataset_dir = config["dataset_dir"] + "/"
-    recording = config["recording"]
-
-    if recording is None:
+    if config["recording"] is None:
         logger.error("Please specify a recording!")
         sys.exit(1)
 
+    instrumentation.enable(config["instrumentation"])
+
+    session = None
+    if config["session"]:
+        session = create_session(config)
+        config["recording"] = "{:02d}".format(int(config["recording"]))
+
+    # Load the recording in the background, while the plotting modules are imported and the window is opened
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        if session is not None:
+            loading = executor.submit(session.get, config["recording"])
+        else:
+            loading = executor.submit(read_recording, config, config["recording"])
+
+        # Select the interactive backend before the first figure is created
+        import matplotlib
+        matplotlib.use('qt5agg')
+        from track_visualizer import TrackVisualizer, DataError, create_figure, wait_for_recording
+
+        config["background_image_path"] = get_background_image_path(config, config["recording"])
+        figure = create_figure(config)
+        if not wait_for_recording(figure, loading, config["recording"]):
+            logger.info("The window was closed before the recording was loaded.")
+            if session is not None:
+                session.close()
+            return
+        tracks, static_info, meta_info = loading.result()[:3]
+        if session is not None:
+            config["background_image_path"] = loading.result().background_image_path
+
+    try:
+        visualization_plot = TrackVisualizer(config, tracks, static_info, meta_info, figure=figure,
+                                             startup_time=START_TIME, session=session)
+        visualization_plot.show()
+    except DataError:
+        sys.exit(1)
+    finally:
+        if session is not None:
+            session.close()
+    finish_instrumentation(config["instrumentation_file"])
+
+
+def create_session(config: dict):
+    """
+    Create a session of all recordings in the dataset directory.
+    :param config: Options as given by the command-line options
+    :return: The session
+    """
+    from recording_session import RecordingSession
+
+    # The recordings are found by the names of their tracks files instead of find_recording_files of the importer,
+    # as importing the importer (and thereby pandas) would delay opening the window
+    recordings = sorted(os.path.basename(tracks_file).split("_")[0]
+                        for tracks_file in glob.glob(config["dataset_dir"] + "/*_tracks.csv"))
+    logger.info("Found {} recordings for the session", len(recordings))
+    return RecordingSession(functools.partial(load_session_recording, config), recordings,
+                            memory_budget=int(config["session_memory"] * 1024 ** 3))
+
+
+def load_session_recording(config: dict, recording: str):
+    """
+    Load a recording of a session including its background image, so that switching to it does not wait for decoding
+    the image.
+    :param config: Options as given by the command-line options
+    :param recording: Name of the recording given by a number
+    :return: The loaded recording
+    """
+    from background_image import load_background_pyramid
+    from recording_session import LoadedRecording
+
+    tracks, tracks_meta, recording_meta = read_recording(config, recording)
+    background_image_path = get_background_image_path(config, recording)
+    if background_image_path is not None:
+        load_background_pyramid(background_image_path, use_cache=config["use_cache"], cache_dir=config["cache_dir"])
+    return LoadedRecording(tracks, tracks_meta, recording_meta, background_image_path)
+
+
+def read_recording(config: dict, recording: str):
+    """
+    Load the csv files of a recording.
+    :param config: Options as given by the command-line options
+    :param recording: Name of the recording given by a number
+    :return: Tuple of (tracks, tracks meta, recording meta)
+    """
+    dataset_dir = config["dataset_dir"] + "/"
     recording = "{:02d}".format(int(recording))
 
     logger.info("Loading recording {} from dataset {}", recording, config["dataset"])
@@ -84,23 +221,28 @@ def main():
     tracks_meta_file = dataset_dir + recording + "_tracksMeta.csv"
     recording_meta_file = dataset_dir + recording + "_recordingMeta.csv"
 
-    # Load csv files
+    # Load csv files. The importer (and thereby pandas) is only imported when it is needed
+    from tracks_import import read_from_csv
     logger.info("Loading csv files {}, {} and {}", tracks_file, tracks_meta_file, recording_meta_file)
-    tracks, static_info, meta_info = read_from_csv(tracks_file, tracks_meta_file, recording_meta_file,
-                                                   include_px_coordinates=True)
+    tracks, tracks_meta, recording_meta = read_from_csv(tracks_file, tracks_meta_file, recording_meta_file,
+                                                        include_px_coordinates=True, use_cache=config["use_cache"],
+                                                        cache_dir=config["cache_dir"],
+                                                        max_cache_size=int(config["max_cache_size"] * 1024 ** 3))
+    return tracks, tracks_meta, recording_meta
+
 
-    # Load background image for visualization
-    background_image_path = dataset_dir + recording + "_background.png"
+def get_background_image_path(config: dict, recording: str):
+    """
+    Get the path of the background image of a recording.
+    :param config: Options as given by the command-line options
+    :param recording: Name of the recording given by a number
+    :return: Path of the background image or None, if the recording has no background image
+    """
+    background_image_path = "{}/{:02d}_background.png".format(config["dataset_dir"], int(recording))
     if not os.path.exists(background_image_path):
         logger.warning("Background image {} missing. Fallback to using a black background.", background_image_path)
-        background_image_path = None
-    config["background_image_path"] = background_image_path
-
-    try:
-        visualization_plot = TrackVisualizer(config, tracks, static_info, meta_info)
-        visualization_plot.show()
-    except DataError:
-        sys.exit(1)
+        return None
+    return background_image_path
 
 
 def str2bool(v):
@@ -0,0 +1,304 @@
+import matplotlib
+# Render without a display. Needs to be selected before pyplot is used
+matplotlib.use('agg')
+
+import functools
+import json
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional, Tuple
+
+import cv2
+import matplotlib.pyplot as plt
+import numpy as np
+from loguru import logger
+
+from instrumentation import instrumentation, finish_instrumentation
+from recording_session import LoadedRecording, RecordingSession
+from run_track_visualization import create_parser, create_session
+from track_visualizer import TrackVisualizer
+
+DEFAULT_FRAME_CACHE_MEMORY = 256 * 1024 ** 2
+# Columns of the scene data returned per object, if they are loaded
+SCENE_COLUMNS = ["trackId", "xCenter", "yCenter", "heading", "length", "width", "xVelocity", "yVelocity",
+                 "xAcceleration", "yAcceleration", "lonVelocity", "latVelocity"]
+REQUEST_PATTERN = re.compile(r"^/recording/(?P<recording>\d+)(/frame/(?P<frame>\d+))?\.(?P<format>png|json)$")
+
+
+class NotFoundError(Exception):
+    """
+    Exception raised, if a requested recording or frame does not exist.
+    """
+    pass
+
+
+def create_args():
+    cs = create_parser(description="Serve rendered frames and scene data of the recordings over HTTP")
+    cs.add_argument('--host', default="127.0.0.1",
+                    help="Address to listen on. Only local clients can connect by default.", type=str)
+    cs.add_argument('--port', default=8000,
+                    help="Port to listen on.", type=int)
+    cs.add_argument('--dpi', default=100,
+                    help="Resolution of the rendered figure in dots per inch.", type=int)
+    cs.add_argument('--frame_cache_memory', default=256,
+                    help="Maximum memory (MB) of the cached responses.", type=float)
+    cs.add_argument('--max_visualizers', default=4,
+                    help="Maximum number of recordings, whose figure is kept for rendering.", type=int)
+    return vars(cs.parse_args())
+
+
+class ResponseCache(object):
+    """
+    Least recently used cache of encoded responses bounded by their size. Concurrent requests of the same response
+    wait for the first one, so that every response is only created once.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_FRAME_CACHE_MEMORY):
+        """
+        :param max_size: Maximum size of all cached responses in bytes
+        """
+        self.max_size = max_size
+        self.size = 0
+        self._responses = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple, create_response: Callable[[], bytes]) -> bytes:
+        """
+        Get a cached response or create it.
+        :param key: Key of the response
+        :param create_response: Function creating the response, if it is neither cached nor created by another request
+        :return: The response
+        """
+        with self._lock:
+            response = self._responses.get(key)
+            if response is not None:
+                self._responses.move_to_end(key)
+                instrumentation.count("cache_hits")
+                return response
+            future = self._pending.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._pending[key] = future
+        if not owner:
+            instrumentation.count("cache_hits")
+            return future.result()
+
+        instrumentation.count("cache_misses")
+        try:
+            response = create_response()
+        except Exception as e:
+            with self._lock:
+                self._pending.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        # Add the response before removing it from the pending ones, so that it is always found by other requests
+        with self._lock:
+            if len(response) <= self.max_size and key not in self._responses:
+                self._responses[key] = response
+                self.size += len(response)
+                while self.size > self.max_size:
+                    self.size -= len(self._responses.popitem(last=False)[1])
+            future.set_result(response)
+            self._pending.pop(key, None)
+        return response
+
+
+class FrameRenderer(object):
+    """
+    Renders the frames and scene data of the recordings of a session. The recordings are loaded once and shared by all
+    requests. As matplotlib is not thread-safe, frames are rendered one after another by headless visualizers, which
+    are kept for the most recently rendered recordings. The visualizer of a recording is closed when the session
+    removes the recording, so that the memory budget of the session also bounds the memory of the visualizers.
+    """
+
+    def __init__(self, config: dict, session: RecordingSession, max_visualizers: int = 4):
+        """
+        :param config: Options as given by the command-line options
+        :param session: Session providing the recordings
+        :param max_visualizers: Maximum number of recordings, whose visualizer is kept
+        """
+        self.config = config
+        self.session = session
+        self.max_visualizers = max_visualizers
+        self._visualizers = OrderedDict()
+        self._render_lock = threading.Lock()
+        session.on_evict = self.release
+
+    def render_png(self, recording: str, frame: int) -> bytes:
+        """
+        Render a frame of a recording to a PNG image.
+        """
+        loaded = self.session.lookup(recording)
+        self._check_frame(loaded, recording, frame)
+        with self._render_lock:
+            visualizer = self._get_visualizer(recording, loaded)
+            with instrumentation.timer("render_frame"):
+                image = visualizer.render_frame(frame)
+        success, png = cv2.imencode(".png", cv2.cvtColor(image, cv2.COLOR_RGB2BGR))
+        if not success:
+            raise ValueError("Could not encode frame {} of recording {}".format(frame, recording))
+        return png.tobytes()
+
+    def scene_json(self, recording: str, frame: int) -> bytes:
+        """
+        Get the state of all objects at a frame of a recording as JSON.
+        """
+        loaded = self.session.lookup(recording)
+        self._check_frame(loaded, recording, frame)
+        tracks, tracks_meta = loaded.tracks, loaded.tracks_meta
+        scene = tracks.frame_index().scene_at(frame)
+        objects = {column: _to_json_values(scene[column]) for column in SCENE_COLUMNS if column in scene}
+        objects["class"] = [tracks_meta[track_idx]["class"] for track_idx in scene["trackIndex"].tolist()]
+        return json.dumps({"recording": recording, "frame": frame, "objects": objects}).encode()
+
+    def recording_json(self, recording: str) -> bytes:
+        """
+        Get the meta data and the frame range of a recording as JSON.
+        """
+        loaded = self.session.lookup(recording)
+        minimum_frame, maximum_frame = _get_frame_range(loaded)
+        recording_meta = {key: value.item() if isinstance(value, np.generic) else value
+                          for key, value in loaded.recording_meta.items()}
+        return json.dumps({"recording": recording, "minimumFrame": minimum_frame, "maximumFrame": maximum_frame,
+                           "numTracks": len(loaded.tracks_meta), "recordingMeta": recording_meta}).encode()
+
+    def release(self, recording: str):
+        """
+        Close the visualizer of a recording, e.g. after the recording was removed from the session.
+        """
+        with self._render_lock:
+            visualizer = self._visualizers.pop(recording, None)
+            if visualizer is not None:
+                plt.close(visualizer.fig)
+
+    @staticmethod
+    def _check_frame(loaded: LoadedRecording, recording: str, frame: int):
+        minimum_frame, maximum_frame = _get_frame_range(loaded)
+        if not minimum_frame <= frame <= maximum_frame:
+            raise NotFoundError("Frame {} is not part of recording {}".format(frame, recording))
+
+    def _get_visualizer(self, recording: str, loaded: LoadedRecording) -> TrackVisualizer:
+        visualizer = self._visualizers.get(recording)
+        if visualizer is not None:
+            self._visualizers.move_to_end(recording)
+            return visualizer
+
+        config = dict(self.config, recording=recording, background_image_path=loaded.background_image_path)
+        visualizer = TrackVisualizer(config, loaded.tracks, loaded.tracks_meta, loaded.recording_meta, headless=True)
+        visualizer.fig.set_dpi(config["dpi"])
+        self._visualizers[recording] = visualizer
+        if len(self._visualizers) > self.max_visualizers:
+            plt.close(self._visualizers.popitem(last=False)[1].fig)
+        return visualizer
+
+
+def _get_frame_range(loaded: LoadedRecording) -> Tuple[int, int]:
+    """
+    Get the first and last frame of a recording, i.e. the frame range covered by its tracks.
+    """
+    frames = [frame for track_meta in loaded.tracks_meta for frame in
+              (track_meta["initialFrame"], track_meta["finalFrame"])]
+    return min(frames, default=0), max(frames, default=0)
+
+
+def _to_json_values(values: np.ndarray) -> list:
+    """
+    Convert an array to lists, in which missing values are given as None.
+    """
+    if values.dtype.kind == "f":
+        values = values.astype(object)
+        values[values != values] = None
+    return values.tolist()
+
+
+class FrameRequestHandler(BaseHTTPRequestHandler):
+    """
+    Handler of the requests
+    GET /recording/<recording>.json: Meta data and frame range of a recording
+    GET /recording/<recording>/frame/<frame>.png: Rendered frame
+    GET /recording/<recording>/frame/<frame>.json: State of all objects at the frame
+    """
+
+    def __init__(self, *args, renderer: FrameRenderer, cache: ResponseCache, **kwargs):
+        self.renderer = renderer
+        self.cache = cache
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self):
+        with instrumentation.timer("request"):
+            match = REQUEST_PATTERN.match(self.path)
+            if match is None:
+                self.send_error(404, "Unknown path")
+                return
+            recording = "{:02d}".format(int(match.group("recording")))
+            if recording not in self.renderer.session.recordings:
+                self.send_error(404, "Unknown recording {}".format(recording))
+                return
+            frame = int(match.group("frame")) if match.group("frame") is not None else None
+            content, content_type = self._create_content(recording, frame, match.group("format"))
+            if content is None:
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(content)))
+            self.send_header("Cache-Control", "max-age=3600")
+            self.end_headers()
+            self.wfile.write(content)
+
+    def _create_content(self, recording: str, frame: Optional[int],
+                        content_format: str) -> Tuple[Optional[bytes], str]:
+        content_type = "image/png" if content_format == "png" else "application/json"
+        try:
+            if frame is None:
+                if content_format != "json":
+                    self.send_error(404, "Unknown path")
+                    return None, content_type
+                create_response = functools.partial(self.renderer.recording_json, recording)
+            elif content_format == "png":
+                create_response = functools.partial(self.renderer.render_png, recording, frame)
+            else:
+                create_response = functools.partial(self.renderer.scene_json, recording, frame)
+            return self.cache.get((recording, frame, content_format), create_response), content_type
+        except NotFoundError as e:
+            self.send_error(404, str(e))
+        except Exception:
+            # Errors of a recording (e.g. corrupt csv files) must not stop the server
+            logger.exception("Could not answer the request {}", self.path)
+            self.send_error(500, "Could not render recording {}".format(recording))
+        return None, content_type
+
+    def log_message(self, format, *args):
+        logger.debug("{} - {}", self.address_string(), format % args)
+
+
+def main():
+    config = create_args()
+    instrumentation.enable(config["instrumentation"])
+
+    session = create_session(config)
+    renderer = FrameRenderer(config, session, config["max_visualizers"])
+    cache = ResponseCache(int(config["frame_cache_memory"] * 1024 ** 2))
+    handler = functools.partial(FrameRequestHandler, renderer=renderer, cache=cache)
+
+    server = ThreadingHTTPServer((config["host"], config["port"]), handler)
+    logger.info("Serving {} recordings on http://{}:{}/recording/<recording>/frame/<frame>.png",
+                len(session.recordings), config["host"], config["port"])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        session.close()
+    finish_instrumentation(config["instrumentation_file"])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,275 @@
+import numpy as np
+from collections import OrderedDict
+from typing import List, Tuple
+
+from tracks_import import FrameIndex
+
+DEFAULT_CELL_SIZE = 10.0
+DEFAULT_MAX_CACHED_FRAMES = 64
+
+
+class GridIndex(object):
+    """
+    Uniform grid over a set of 2D points. The points are sorted by the id of their grid cell, so that the points of a
+    cell are given by a range of the sorted points. All queries are batched: they take an array of query points and
+    return the results in compressed sparse row (CSR) form, i.e. the results of query i are
+    indices[offsets[i]:offsets[i + 1]].
+    """
+
+    def __init__(self, points: np.ndarray, cell_size: float = DEFAULT_CELL_SIZE):
+        """
+        :param points: Array of shape (n, 2) containing the points. Points containing NaN are never returned
+        :param cell_size: Edge length of the grid cells. Should be in the order of magnitude of the query radii
+        """
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        self.cell_size = float(cell_size)
+
+        valid = np.flatnonzero(np.isfinite(self.points).all(axis=1))
+        cells = np.floor(self.points[valid] / self.cell_size).astype(np.int64)
+        if len(cells):
+            self.origin = cells.min(axis=0)
+            self.shape = cells.max(axis=0) - self.origin + 1
+        else:
+            self.origin = np.zeros(2, dtype=np.int64)
+            self.shape = np.zeros(2, dtype=np.int64)
+        cell_ids = self._cell_ids(cells)
+
+        order = np.argsort(cell_ids, kind="stable")
+        self.point_indices = valid[order]
+        sorted_cell_ids = cell_ids[order]
+        self.cell_ids, self.cell_starts = np.unique(sorted_cell_ids, return_index=True)
+        self.cell_ends = np.append(self.cell_starts[1:], len(sorted_cell_ids))
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def _cell_ids(self, cells: np.ndarray) -> np.ndarray:
+        cells = cells - self.origin
+        return cells[:, 0] * self.shape[1] + cells[:, 1]
+
+    def _box_candidates(self, minimum: np.ndarray, maximum: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get all points in the grid cells overlapping the given boxes.
+        :param minimum: Array of shape (m, 2) containing the lower left corner of each box
+        :param maximum: Array of shape (m, 2) containing the upper right corner of each box
+        :return: Index of the box and index of the point for every candidate, sorted by the box
+        """
+        # Clip the cell ranges to the grid before converting them to integers. Boxes outside the grid and boxes
+        # containing NaN get an empty range
+        valid = np.isfinite(minimum).all(axis=1) & np.isfinite(maximum).all(axis=1)
+        first_cell = np.clip(np.floor(minimum / self.cell_size) - self.origin, 0, self.shape)
+        last_cell = np.clip(np.floor(maximum / self.cell_size) - self.origin, -1, self.shape - 1)
+        first_cell = np.where(valid[:, np.newaxis], first_cell, 0).astype(np.int64)
+        last_cell = np.where(valid[:, np.newaxis], last_cell, -1).astype(np.int64)
+        num_cells = np.maximum(last_cell - first_cell + 1, 0)
+        num_cells_per_box = num_cells[:, 0] * num_cells[:, 1]
+
+        # Enumerate all cells of all boxes
+        box_of_cell = np.repeat(np.arange(len(minimum)), num_cells_per_box)
+        cell_number = np.arange(len(box_of_cell)) - np.repeat(np.cumsum(num_cells_per_box) - num_cells_per_box,
+                                                                num_cells_per_box)
+        cell_x = first_cell[box_of_cell, 0] + cell_number // np.maximum(num_cells[box_of_cell, 1], 1)
+        cell_y = first_cell[box_of_cell, 1] + cell_number % np.maximum(num_cells[box_of_cell, 1], 1)
+        cell_ids = cell_x * self.shape[1] + cell_y
+
+        # Look up the occupied cells and enumerate their points
+        position = np.minimum(np.searchsorted(self.cell_ids, cell_ids), max(len(self.cell_ids) - 1, 0))
+        occupied = self.cell_ids[position] == cell_ids if len(self.cell_ids) else np.zeros(len(cell_ids), dtype=bool)
+        box_of_cell, position = box_of_cell[occupied], position[occupied]
+        starts, num_points = self.cell_starts[position], self.cell_ends[position] - self.cell_starts[position]
+        box_indices = np.repeat(box_of_cell, num_points)
+        sorted_positions = np.arange(num_points.sum()) - np.repeat(np.cumsum(num_points) - num_points - starts,
+                                                                    num_points)
+        return box_indices, self.point_indices[sorted_positions]
+
+    def query_box(self, minimum: np.ndarray, maximum: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find all points within axis-aligned boxes.
+        :param minimum: Array of shape (m, 2) containing the lower left corner of each box
+        :param maximum: Array of shape (m, 2) containing the upper right corner of each box
+        :return: Offsets of shape (m + 1,) and indices of the points within each box in CSR form
+        """
+        minimum = np.asarray(minimum, dtype=np.float64).reshape(-1, 2)
+        maximum = np.asarray(maximum, dtype=np.float64).reshape(-1, 2)
+        box_indices, point_indices = self._box_candidates(minimum, maximum)
+        points = self.points[point_indices]
+        inside = np.all((points >= minimum[box_indices]) & (points <= maximum[box_indices]), axis=1)
+        return _to_csr(box_indices[inside], point_indices[inside], len(minimum))
+
+    def query_radius(self, centers: np.ndarray, radius, return_distance: bool = False):
+        """
+        Find all points within a radius around query points.
+        :param centers: Array of shape (m, 2) containing the query points
+        :param radius: Radius, either a single value or one value per query point
+        :param return_distance: If True, the distances of the found points are returned as third array
+        :return: Offsets of shape (m + 1,) and indices of the points within the radius of each query point in CSR form.
+                 Within each query, the points are sorted by their index
+        """
+        centers = np.asarray(centers, dtype=np.float64).reshape(-1, 2)
+        radius = np.broadcast_to(np.asarray(radius, dtype=np.float64), (len(centers),))[:, np.newaxis]
+        query_indices, point_indices = self._box_candidates(centers - radius, centers + radius)
+        distances = np.hypot(*(self.points[point_indices] - centers[query_indices]).T)
+        inside = distances <= radius[query_indices, 0]
+        query_indices, point_indices, distances = query_indices[inside], point_indices[inside], distances[inside]
+
+        order = np.lexsort((point_indices, query_indices))
+        offsets, point_indices = _to_csr(query_indices[order], point_indices[order], len(centers))
+        if return_distance:
+            return offsets, point_indices, distances[order]
+        return offsets, point_indices
+
+    def query_knn(self, centers: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the k nearest points of query points. The search radius is doubled, starting at the cell size, until
+        enough points are found for every query point.
+        :param centers: Array of shape (m, 2) containing the query points
+        :param k: Number of neighbors
+        :return: Indices and distances of shape (m, k) of the nearest points sorted by distance. Missing neighbors, if
+                 there are less than k points, have the index -1 and the distance inf
+        """
+        centers = np.asarray(centers, dtype=np.float64).reshape(-1, 2)
+        indices = np.full((len(centers), k), -1, dtype=np.int64)
+        distances = np.full((len(centers), k), np.inf)
+        num_points = len(self.point_indices)
+        if num_points == 0 or k == 0:
+            return indices, distances
+
+        # Radius, which covers the whole grid from every query point
+        grid_minimum = self.origin * self.cell_size
+        grid_maximum = (self.origin + self.shape) * self.cell_size
+        max_radius = np.hypot(*np.maximum(np.abs(centers - grid_minimum), np.abs(centers - grid_maximum)).T)
+
+        pending = np.flatnonzero(np.isfinite(centers).all(axis=1))
+        radius = np.full(len(centers), self.cell_size)
+        while len(pending):
+            offsets, found, found_distances = self.query_radius(centers[pending], radius[pending],
+                                                                return_distance=True)
+            counts = np.diff(offsets)
+            done = (counts >= min(k, num_points)) | (radius[pending] >= max_radius[pending])
+            for i in np.flatnonzero(done):
+                start, end = offsets[i], offsets[i + 1]
+                nearest = np.argsort(found_distances[start:end], kind="stable")[:k]
+                indices[pending[i], :len(nearest)] = found[start:end][nearest]
+                distances[pending[i], :len(nearest)] = found_distances[start:end][nearest]
+            radius[pending] *= 2
+            pending = pending[~done]
+        return indices, distances
+
+    def query_pairs(self, radius: float) -> np.ndarray:
+        """
+        Find all pairs of points within a distance to each other.
+        :param radius: Maximum distance
+        :return: Array of shape (p, 2) with the indices (i, j) of each pair with i < j
+        """
+        offsets, point_indices = self.query_radius(self.points, radius)
+        query_indices = np.repeat(np.arange(len(self.points)), np.diff(offsets))
+        pairs = query_indices < point_indices
+        return np.stack([query_indices[pairs], point_indices[pairs]], axis=1)
+
+
+def _to_csr(query_indices: np.ndarray, point_indices: np.ndarray, num_queries: int) -> Tuple[np.ndarray, np.ndarray]:
+    offsets = np.zeros(num_queries + 1, dtype=np.int64)
+    np.cumsum(np.bincount(query_indices, minlength=num_queries), out=offsets[1:])
+    return offsets, point_indices
+
+
+def split_csr(offsets: np.ndarray, indices: np.ndarray) -> List[np.ndarray]:
+    """
+    Convert query results in CSR form to a list with one array per query.
+    """
+    return np.split(indices, offsets[1:-1])
+
+
+class FrameSpatialIndex(object):
+    """
+    Spatial index of the object centers of a recording, which creates a grid index per frame on first use. The grids
+    of the most recently used frames are kept. All results contain track indices of the RecordingStore.
+    """
+
+    def __init__(self, frame_index: FrameIndex, cell_size: float = DEFAULT_CELL_SIZE,
+                 max_cached_frames: int = DEFAULT_MAX_CACHED_FRAMES, column: str = "center"):
+        """
+        :param frame_index: Frame-major index of the tracks, see RecordingStore.frame_index()
+        :param cell_size: Edge length of the grid cells
+        :param max_cached_frames: Maximum number of frames, whose grid is kept in memory
+        :param column: Column containing the positions of the objects
+        """
+        self.frame_index = frame_index
+        self.cell_size = cell_size
+        self.max_cached_frames = max_cached_frames
+        self.column = column
+        self._grids = OrderedDict()
+
+    def grid_at(self, frame: int) -> GridIndex:
+        """
+        Get the grid index of the objects at a frame. The points of the grid are the rows of scene_at(frame).
+        """
+        grid = self._grids.get(frame)
+        if grid is None:
+            rows = self.frame_index.frame_rows(frame)
+            grid = GridIndex(self.frame_index.column(self.column)[rows], self.cell_size)
+            self._grids[frame] = grid
+            if len(self._grids) > self.max_cached_frames:
+                self._grids.popitem(last=False)
+        else:
+            self._grids.move_to_end(frame)
+        return grid
+
+    def track_indices_at(self, frame: int) -> np.ndarray:
+        return self.frame_index.track_indices[self.frame_index.frame_rows(frame)]
+
+    def query_radius(self, frame: int, centers: np.ndarray, radius) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find all objects within a radius around query points at a frame.
+        :return: Offsets and track indices in CSR form
+        """
+        offsets, rows = self.grid_at(frame).query_radius(centers, radius)
+        return offsets, self.track_indices_at(frame)[rows]
+
+    def query_box(self, frame: int, minimum: np.ndarray, maximum: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find all objects within axis-aligned boxes at a frame.
+        :return: Offsets and track indices in CSR form
+        """
+        offsets, rows = self.grid_at(frame).query_box(minimum, maximum)
+        return offsets, self.track_indices_at(frame)[rows]
+
+    def query_knn(self, frame: int, centers: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the k nearest objects of query points at a frame.
+        :return: Track indices and distances of shape (m, k). Missing neighbors have the index -1
+        """
+        rows, distances = self.grid_at(frame).query_knn(centers, k)
+        track_indices = np.append(self.track_indices_at(frame), -1)
+        return track_indices[rows], distances
+
+    def neighbors(self, frame: int, track_indices: np.ndarray, radius: float) -> List[np.ndarray]:
+        """
+        Find the objects within a radius around tracks at a frame, e.g. all objects within 20 m of track 5.
+        :param frame: Frame number
+        :param track_indices: Indices of the query tracks in the RecordingStore
+        :param radius: Radius around the center of each query track
+        :return: List with the track indices of the neighbors for every query track, not containing the track itself.
+                 Tracks, which are not present at the frame, have no neighbors
+        """
+        track_indices = np.atleast_1d(track_indices)
+        frame_track_indices = self.track_indices_at(frame)
+        # The rows of a frame are sorted by track, so the row of each query track is found by binary search
+        rows = np.minimum(np.searchsorted(frame_track_indices, track_indices), max(len(frame_track_indices) - 1, 0))
+        present = frame_track_indices[rows] == track_indices if len(frame_track_indices) else \
+            np.zeros(len(track_indices), dtype=bool)
+        centers = np.full((len(track_indices), 2), np.nan)
+        centers[present] = self.grid_at(frame).points[rows[present]]
+
+        offsets, neighbor_indices = self.query_radius(frame, centers, radius)
+        query_numbers = np.repeat(np.arange(len(track_indices)), np.diff(offsets))
+        not_self = neighbor_indices != track_indices[query_numbers]
+        offsets, neighbor_indices = _to_csr(query_numbers[not_self], neighbor_indices[not_self], len(track_indices))
+        return split_csr(offsets, neighbor_indices)
+
+    def pairs_at(self, frame: int, radius: float) -> np.ndarray:
+        """
+        Find all pairs of objects within a distance to each other at a frame.
+        :return: Array of shape (p, 2) with the track indices of each pair
+        """
+        return self.track_indices_at(frame)[self.grid_at(frame).query_pairs(radius)]
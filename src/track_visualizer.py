@@ -1,31 +1,166 @@
-import matplotlib
 from matplotlib.backend_bases import MouseButton
 
-matplotlib.use('qt5agg')
-
+import copy
+import functools
 import json
 import sys
 import os
-import cv2
+import time
+from concurrent.futures import Future
 import numpy as np
 import matplotlib.pyplot as plt
 from pathlib import Path
-from typing import List
+from typing import TYPE_CHECKING, List, Optional, Tuple
 
 from loguru import logger
 from matplotlib import animation
+from matplotlib.collections import LineCollection, PolyCollection
 from matplotlib.widgets import Button, TextBox
 
+from background_image import BackgroundLayer, get_image_extent, load_background_pyramid
+from instrumentation import instrumentation
+from playback_scheduler import PlaybackScheduler
+from trajectory_layer import TrajectoryLayer
+
+if TYPE_CHECKING:
+    # Not imported at runtime, as the importer imports pandas, which would delay opening the window
+    from recording_session import RecordingSession
+    from tracks_import import RecordingStore
+
+# Vertices of a polygon approximating the unit circle, used to draw circles in collections
+CIRCLE_VERTICES = np.stack([np.cos(np.linspace(0, 2 * np.pi, 16, endpoint=False)),
+                            np.sin(np.linspace(0, 2 * np.pi, 16, endpoint=False))], axis=1)
+# Radius of objects without a bbox in display coordinates
+CIRCLE_RADIUS = 2
+# Minimum size (px) of a typical object on screen to draw the objects in full detail
+MIN_OBJECT_SIZE_PX = 5
+# Size (pt^2) of the dots drawn instead of the objects when zoomed out
+DOT_SIZE = 9
+# Minimum time (ms) between two updates of the animation
+MIN_ANIMATION_INTERVAL = 20
+
+
+@functools.lru_cache(maxsize=None)
+def read_visualizer_params(params_file: str) -> dict:
+    """
+    Read the dataset specific visualization parameters. The file is only parsed once per process, so the returned
+    dictionary must not be modified.
+    """
+    with open(params_file) as f:
+        return json.load(f)
+
+
+def create_figure(config: dict, headless: bool = False):
+    """
+    Create the figure of the visualizer showing the background image of the recording. The figure can be created
+    (and shown) before the tracks are loaded and is then passed to the TrackVisualizer.
+    :param config: Visualization options as given by the command-line options of run_track_visualization.py. Has to
+                   contain the path of the background image as "background_image_path"
+    :param headless: Create the figure without toolbar and space for the widgets
+    :return: Tuple of (figure, main axes)
+    """
+    fig, ax = plt.subplots(1, 1)
+    fig.set_size_inches(15, 8)
+    # Without widgets, the axes can use the whole figure
+    plt.subplots_adjust(left=0.0, right=1.0, bottom=0.0 if headless else 0.10, top=1.00)
+
+    if not headless:
+        # Remove unwanted toolbar buttons
+        toolbar = plt.get_current_fig_manager().toolbar
+        unwanted_buttons = ['Subplots', 'Save', 'Customize', 'Forward', 'Back']
+        for x in toolbar.actions():
+            if x.text() in unwanted_buttons:
+                toolbar.removeAction(x)
+
+        fig.canvas.set_window_title("Tracks Visualizer - Dataset {}, Recording {}".format(
+            config["dataset"].lower(), config["recording"]))
+
+    set_background(ax, config["background_image_path"], config)
+    ax.axis('off')
+    return fig, ax
+
+
+def wait_for_recording(figure: tuple, loading: Future, recording: str) -> bool:
+    """
+    Keep the window responsive and show the progress while a recording is loaded, e.g. on startup or when switching
+    to a recording, which was not preloaded.
+    :param figure: Figure and main axes of the visualizer
+    :param loading: Future of the loaded recording
+    :param recording: Name of the recording
+    :return: False, if the window was closed before the recording was loaded
+    """
+    fig, ax = figure
+    label = ax.text(0.5, 0.5, "", transform=ax.transAxes, ha="center", va="center", fontsize=16, color="white",
+                    bbox={"boxstyle": "round,pad=0.5", "fc": "black", "alpha": 0.6})
+    start_time = time.perf_counter()
+    while not loading.done():
+        if not plt.fignum_exists(fig.number):
+            return False
+        label.set_text("Loading recording {}{} ({:.0f} s)".format(recording, "." * (int(time.perf_counter() * 2) % 4),
+                                                                   time.perf_counter() - start_time))
+        # Draws the figure and processes the events of the window
+        fig.canvas.draw_idle()
+        plt.pause(0.1)
+    label.remove()
+    return True
+
+
+def set_background(ax, background_image_path: Optional[str], config: dict):
+    """
+    Show a background image on the main axes of the visualizer and remove the previous one. Only the visible region of
+    the pyramid level matching the zoom is drawn.
+    :param ax: Main axes of the visualizer
+    :param background_image_path: Path of the background image. If None, a black background is shown
+    :param config: Visualization options as given by the command-line options of run_track_visualization.py
+    """
+    if getattr(ax, "background_layer", None) is not None:
+        ax.background_layer.remove()
+        ax.background_layer = None
+    if getattr(ax, "background_image", None) is not None:
+        ax.background_image.remove()
+        ax.background_image = None
+
+    if background_image_path and os.path.exists(background_image_path):
+        logger.info("Loading background image from {}", background_image_path)
+        with instrumentation.timer("background_image"):
+            pyramid = load_background_pyramid(background_image_path, use_cache=config["use_cache"],
+                                              cache_dir=config["cache_dir"])
+        # The layer is kept by the axes, as the callbacks of the axes only hold weak references
+        ax.background_layer = BackgroundLayer(ax, pyramid)
+    else:
+        logger.warning("No background image given or path not valid. Using fallback black background.")
+        ax.background_image = ax.imshow(np.zeros((1, 1, 3), dtype="uint8"), extent=get_image_extent((1700, 1700)))
+
 
 class TrackVisualizer(object):
-    def __init__(self, config: dict, tracks: List[dict], tracks_meta: List[dict], recording_meta: dict):
+    def __init__(self, config: dict, tracks: "RecordingStore", tracks_meta: List[dict], recording_meta: dict,
+                 headless: bool = False, figure: Optional[Tuple[plt.Figure, plt.Axes]] = None,
+                 startup_time: Optional[float] = None, session: Optional["RecordingSession"] = None):
+        """
+        :param config: Visualization options as given by the command-line options of run_track_visualization.py
+        :param tracks: Tracks of the recording
+        :param tracks_meta: Tracks meta of the recording
+        :param recording_meta: Recording meta of the recording
+        :param headless: Only create the figure without toolbar, widgets and animation, e.g. to render frames offline
+                         using render_frame
+        :param figure: Figure and main axes as created by create_figure, e.g. to show the window while the recording
+                       is loaded. By default, a new figure is created
+        :param startup_time: Start time (as given by time.perf_counter) of the application. If given, the time until
+                             the first frame is drawn is reported
+        :param session: Session of recordings to switch between at runtime. The given recording has to be its current
+                        recording
+        """
+        self.headless = headless
         self.config = config
         self.input_path = config["dataset_dir"]
         self.dataset = config["dataset"].lower()
-        self.location_id = recording_meta["locationId"]
-        self.recording_name = config["recording"]
+        self.session = session
+        # Name of the recording, which is loaded to switch to it
+        self.loading_recording = None
         self.playback_speed = config["playback_speed"]
         self.suppress_track_window = config["suppress_track_window"]
+        self.pooled_rendering = config["pooled_rendering"]
+        self.show_frame_stats = config["show_frame_stats"] and instrumentation.enabled
 
         # Currently clicked vehicle
         self.clicked_track_id = None
@@ -42,6 +177,8 @@ class TrackVisualizer(object):
         }
         vehicle_keys = list(self.surrounding_vehicles_colors.keys())
         self.surrounding_vehicles_ids = dict(zip(vehicle_keys, -1 * np.ones(len(vehicle_keys), dtype=int)))
+        # Colors of the surrounding vehicles of the clicked vehicle by their track id
+        self.highlighted_colors = {}
 
         # Load dataset specific visualization parameters from file
         dataset_params_path = Path(config["visualizer_params_dir"]) / "visualizer_params.json"
@@ -50,21 +187,93 @@ class TrackVisualizer(object):
             logger.error("Could not find dataset visualization parameters in {}", dataset_params_path)
             sys.exit(-1)
 
-        with open(dataset_params_path) as f:
-            self.dataset_params = json.load(f)
+        self.dataset_params = read_visualizer_params(str(dataset_params_path.resolve()))
 
         if self.dataset not in self.dataset_params["datasets"]:
             logger.error("Visualization parameters for dataset {} not found in {}. Please make sure, that the needed "
                          "parameters are given", self.dataset, dataset_params_path)
             sys.exit(-1)
 
-        self.dataset_params = self.dataset_params["datasets"][self.dataset]
+        # The parameters are copied, as the cached parameters are shared by all visualizers
+        self.dataset_params = copy.deepcopy(self.dataset_params["datasets"][self.dataset])
         self.scale_down_factor = self.dataset_params["scale_down_factor"]
 
-        self.tracks = tracks
-        self.tracks_meta = tracks_meta
-        self.recording_meta = recording_meta
+        # Initialize data variables
+        self.plot_handles = []
+        self.track_info_figures = {}
+
+        # Create figure and axes
+        self.fig, self.ax = figure if figure is not None else create_figure(config, headless)
+
+        # Dictionaries for the style of the different objects that are visualized
+        self.bbox_style = dict(fill=True, alpha=0.4, zorder=19)
+        self.orientation_style = dict(facecolor="k", fill=True, edgecolor="k", lw=0.1, alpha=0.6, zorder=20)
+        self.text_style = dict(picker=True, size=4, color='k', zorder=22, ha="center")
+        self.text_box_style = dict(boxstyle="round,pad=0.2", alpha=.6, ec="black", lw=0.2, zorder=21)
+        self.trajectory_style = dict(linewidth=1, zorder=10)
+        self.future_trajectory_style = dict(color="linen", linewidth=1, alpha=0.7, zorder=10)
+        self.centroid_style = dict(fill=True, edgecolor="black", lw=0.1, alpha=1, radius=0.5, zorder=30)
+        # self.class_colors = dict(car="lightblue", van="purple", truck_bus="orange", bus="orange", truck="orange",
+        #                          pedestrian="red", bicycle="yellow", motorcycle="yellow", default="green")
+        self.class_colors = dict(car="lightblue", van="lightblue", truck_bus="lightblue", bus="lightblue",
+                                 truck="lightblue",
+                                 pedestrian="lightblue", bicycle="lightblue", motorcycle="lightblue",
+                                 default="lightblue")
+
+        # Create legend
+        self.legend_visible = False
+
+        # Initialize main axes
+        self.ax.set_autoscale_on(False)
+        self.ax.set_xticklabels([])
+        self.ax.set_yticklabels([])
+        self.ax.axis('off')
+
+        if self.pooled_rendering:
+            self._create_pooled_artists()
+
+        self.playback_scheduler = None
+        self._set_recording(config["recording"], tracks, tracks_meta, recording_meta)
+
+        # Do not start the animation by default
+        self.animation_running = False
+        if headless:
+            return
+
+        self._create_widgets()
+        self._set_controls_activation(True)
+
+        # Create animation instance•
+        self.track_animation = animation.FuncAnimation(self.fig, self._update_figure,
+                                                       interval=self._get_animation_interval(), blit=True,
+                                                       init_func=self._clear_figure, cache_frame_data=False)
+
+        # Add listener to figure so that clicks on tracks open a plot window
+        self.fig.canvas.mpl_connect('pick_event', self._open_track_plots_window)
+
+        self.startup_time = startup_time
+        if startup_time is not None:
+            self.first_draw_callback = self.fig.canvas.mpl_connect('draw_event', self._on_first_draw)
 
+    def _on_first_draw(self, _):
+        """
+        Report the time from the start of the application until the first frame was drawn.
+        """
+        self.fig.canvas.mpl_disconnect(self.first_draw_callback)
+        time_to_first_frame = time.perf_counter() - self.startup_time
+        instrumentation.record("time_to_first_frame", time_to_first_frame)
+        logger.info("Time to first frame: {:.2f} s", time_to_first_frame)
+
+    def _set_recording(self, recording_name: str, tracks: "RecordingStore", tracks_meta: List[dict],
+                       recording_meta: dict):
+        """
+        Set the recording shown by the visualizer and prepare everything needed to draw its frames. The visualizer
+        starts at the first frame of the recording.
+        :param recording_name: Name of the recording
+        :param tracks: Tracks of the recording
+        :param tracks_meta: Tracks meta of the recording
+        :param recording_meta: Recording meta of the recording
+        """
         # Check whether tracks and tracks_meta match each other
         error_message = "The tracks file and the tracksMeta file is not matching each other. " \
                         "Please check whether you modified any of these files."
@@ -76,48 +285,32 @@ class TrackVisualizer(object):
                 logger.error(error_message)
                 raise DataError("Failed", error_message)
 
-        # Determine the first and last frame
-        self.minimum_frame = min(meta["initialFrame"] for meta in self.tracks_meta)
-        self.maximum_frame = max(meta["finalFrame"] for meta in self.tracks_meta)
-        logger.info("The recording contains tracks from frame {} to {}.", self.minimum_frame, self.maximum_frame)
-
-        # Create a mapping between frame and idxs of tracks for quick lookup during playback
-        self.frame_to_track_idxs = {}
-        for i_frame in range(self.minimum_frame, self.maximum_frame + 1):
-            indices = [i_track for i_track, track_meta in enumerate(self.tracks_meta)
-                       if track_meta["initialFrame"] <= i_frame <= track_meta["finalFrame"]]
-            self.frame_to_track_idxs[i_frame] = indices
-
-        # Initialize data variables
-        self.plot_handles = []
-        self.track_info_figures = {}
-
-        # Create figure and axes
-        self.fig, self.ax = plt.subplots(1, 1)
-        self.fig.set_size_inches(15, 8)
-        plt.subplots_adjust(left=0.0, right=1.0, bottom=0.10, top=1.00)
+        self.recording_name = recording_name
+        self.location_id = recording_meta["locationId"]
+        self.tracks = tracks
+        self.tracks_meta = tracks_meta
+        self.recording_meta = recording_meta
 
-        # Remove unwanted toolbar buttons
-        toolbar = plt.get_current_fig_manager().toolbar
-        unwanted_buttons = ['Subplots', 'Save', 'Customize', 'Forward', 'Back']
-        for x in toolbar.actions():
-            if x.text() in unwanted_buttons:
-                toolbar.removeAction(x)
+        # Create a mapping between frame and idxs of tracks for quick lookup during playback. The importer is already
+        # imported at this point, as the recording was loaded by it
+        from tracks_import import TrackIntervalIndex
+        with instrumentation.timer("frame_to_track_idxs"):
+            self.frame_to_track_idxs = TrackIntervalIndex(self.tracks_meta)
 
-        self.fig.canvas.set_window_title("Tracks Visualizer - Dataset {}, Recording {}".format(self.dataset,
-                                                                                               self.recording_name))
+        # Determine the first and last frame
+        self.minimum_frame = self.frame_to_track_idxs.minimum_frame
+        self.maximum_frame = self.frame_to_track_idxs.maximum_frame
+        logger.info("The recording contains tracks from frame {} to {}.", self.minimum_frame, self.maximum_frame)
 
-        # Show background image
-        background_image_path = self.config["background_image_path"]
-        if background_image_path and os.path.exists(background_image_path):
-            logger.info("Loading background image from {}", background_image_path)
-            self.background_image = cv2.cvtColor(cv2.imread(background_image_path), cv2.COLOR_BGR2RGB)
-            (self.image_height, self.image_width) = self.background_image.shape[:2]
-        else:
-            logger.warning("No background image given or path not valid. Using fallback black background.")
-            self.image_height, self.image_width = 1700, 1700
-            self.background_image = np.zeros((self.image_height, self.image_width, 3), dtype="uint8")
-        self.ax.imshow(self.background_image)
+        # Scale the display coordinates of all rows once, so that drawing a frame only indexes into the scaled arrays
+        self.track_offsets = tracks.offsets
+        self.center_points_display = tracks.column("centerVis") / self.scale_down_factor
+        self.bboxes_display = tracks.column("bboxVis") / self.scale_down_factor
+        self.track_has_bbox = tracks.track_masks.get("bboxVis", np.ones(len(tracks), dtype=bool))
+        with instrumentation.timer("culling_bounds"):
+            self._compute_culling_bounds()
+        # The trajectories are simplified, so that drawing them does not slow down with the age of the tracks
+        self.trajectory_layer = TrajectoryLayer(self.center_points_display, self.track_offsets)
 
         # Find correct text font size
         track_label_font_size = 4
@@ -128,25 +321,104 @@ class TrackVisualizer(object):
             else:
                 # For highway areas, we need bigger font sizes because the relevant areas are bigger
                 track_label_font_size = 6
+        self.text_style["size"] = track_label_font_size
+        if self.pooled_rendering:
+            for text_patch in self.text_pool:
+                text_patch.set_fontsize(track_label_font_size)
 
-        # Dictionaries for the style of the different objects that are visualized
-        self.bbox_style = dict(fill=True, alpha=0.4, zorder=19)
-        self.orientation_style = dict(facecolor="k", fill=True, edgecolor="k", lw=0.1, alpha=0.6, zorder=20)
-        self.text_style = dict(picker=True, size=track_label_font_size, color='k', zorder=22, ha="center")
-        self.text_box_style = dict(boxstyle="round,pad=0.2", alpha=.6, ec="black", lw=0.2, zorder=21)
-        self.trajectory_style = dict(linewidth=1, zorder=10)
-        self.future_trajectory_style = dict(color="linen", linewidth=1, alpha=0.7, zorder=10)
-        self.centroid_style = dict(fill=True, edgecolor="black", lw=0.1, alpha=1, radius=0.5, zorder=30)
-        # self.class_colors = dict(car="lightblue", van="purple", truck_bus="orange", bus="orange", truck="orange",
-        #                          pedestrian="red", bicycle="yellow", motorcycle="yellow", default="green")
-        self.class_colors = dict(car="lightblue", van="lightblue", truck_bus="lightblue", bus="lightblue",
-                                 truck="lightblue",
-                                 pedestrian="lightblue", bicycle="lightblue", motorcycle="lightblue",
-                                 default="lightblue")
+        if "relevant_areas" in self.dataset_params and \
+                str(recording_meta["locationId"]) in self.dataset_params["relevant_areas"]:
+            limits = self.dataset_params["relevant_areas"][str(recording_meta["locationId"])]
+            self.ax.set_xlim([int(x / self.scale_down_factor) for x in limits["x_lim"]])
+            self.ax.set_ylim([int(y / self.scale_down_factor) for y in limits["y_lim"]])
 
-        # Create legend
-        self.legend_visible = False
+        # Initialize visualization options
+        self.current_frame = self.minimum_frame
+        self.clicked_track_id = None
+        self.surrounding_vehicles_ids = dict.fromkeys(self.surrounding_vehicles_ids, -1)
+        self.highlighted_colors = {}
+
+        if self.pooled_rendering:
+            self.viewport = self._get_viewport()
+
+        # Schedule the frames during playback to hold the playback rate, if given
+        if self.playback_scheduler is not None:
+            self.playback_scheduler.close()
+            self.playback_scheduler = None
+        if self.pooled_rendering and not self.headless and self.config["playback_rate"] is not None:
+            self.playback_scheduler = PlaybackScheduler(self._prepare_frame, recording_meta["frameRate"],
+                                                        self.config["playback_rate"], self.minimum_frame,
+                                                        self.maximum_frame)
+
+    def _get_animation_interval(self) -> float:
+        """
+        Get the time (ms) between two updates of the animation. With a target playback rate, the figure is not updated
+        more often than frames are due.
+        """
+        if self.playback_scheduler is None:
+            return MIN_ANIMATION_INTERVAL
+        return max(MIN_ANIMATION_INTERVAL, self.playback_scheduler.frame_interval)
 
+    def switch_recording(self, recording_name: str):
+        """
+        Switch to another recording of the session. The playback is stopped and the windows of clicked tracks are
+        closed. If the recording was not preloaded, the current recording stays shown and the window stays responsive
+        while the recording is loaded in the background.
+        :param recording_name: Name of the recording
+        """
+        if self.session is None or recording_name not in self.session.recordings:
+            logger.warning("The recording {} is not part of the session.", recording_name)
+            return
+        if self.loading_recording is not None:
+            logger.warning("Recording {} is still loading. Please wait before switching again.",
+                           self.loading_recording)
+            return
+        start_time = time.perf_counter()
+        loading = self.session.load_async(recording_name)
+        if not loading.done() and not self.headless:
+            self.loading_recording = recording_name
+            try:
+                if not wait_for_recording((self.fig, self.ax), loading, recording_name):
+                    return
+            finally:
+                self.loading_recording = None
+        try:
+            loading.result()
+            # The recording is kept by the session now, so that this only makes it the current one
+            loaded = self.session.get(recording_name)
+        except Exception:
+            return
+
+        if self.animation_running:
+            self._start_stop_animation(None)
+        for track_id in list(self.track_info_figures):
+            plt.close(self.track_info_figures.pop(track_id)["main_figure"])
+
+        previous_recording_name = self.recording_name
+        try:
+            self._set_recording(recording_name, loaded.tracks, loaded.tracks_meta, loaded.recording_meta)
+        except DataError:
+            logger.error("Could not show recording {}. Staying at recording {}.", recording_name,
+                         previous_recording_name)
+            # Make the shown recording the current one of the session again
+            self.session.get(previous_recording_name)
+            return
+        set_background(self.ax, loaded.background_image_path, self.config)
+
+        if not self.headless:
+            self.fig.canvas.set_window_title("Tracks Visualizer - Dataset {}, Recording {}".format(
+                self.dataset, recording_name))
+            # The frame rate of the recordings may differ
+            self.track_animation.event_source.interval = self._get_animation_interval()
+            self.textbox_frame.set_val(self.current_frame)
+            self.textbox_recording.set_val(recording_name)
+        self.fig.canvas.draw_idle()
+        logger.info("Switched to recording {} in {:.2f} s", recording_name, time.perf_counter() - start_time)
+
+    def _create_widgets(self):
+        """
+        Create the widgets for the navigation through the recording.
+        """
         # Define axes for the widgets
         self.ax_textbox = self.fig.add_axes([0.27, 0.035, 0.04, 0.04])
         self.ax_button_previous2 = self.fig.add_axes([0.32, 0.035, 0.06, 0.04])
@@ -180,6 +452,12 @@ class TrackVisualizer(object):
 
         self.button_reset = Button(self.ax_button_reset, 'Reset')
 
+        # In a session, other recordings can be chosen by their name
+        self.textbox_recording = None
+        if self.session is not None:
+            self.ax_textbox_recording = self.fig.add_axes([0.80, 0.035, 0.04, 0.04])
+            self.textbox_recording = TextBox(self.ax_textbox_recording, 'Recording ', initial=self.recording_name)
+
         # Define the callbacks for the widgets' actions
         self.button_previous.on_clicked(self._on_click_button_previous)
         self.button_previous2.on_clicked(self._update_button_previous2)
@@ -189,35 +467,16 @@ class TrackVisualizer(object):
         self.button_reset.on_clicked(self._reset)
         self.fig.canvas.mpl_connect('key_press_event', self._on_keypress)
 
-        # Initialize main axes
-        self.ax.set_autoscale_on(False)
-        self.ax.set_xticklabels([])
-        self.ax.set_yticklabels([])
-        if "relevant_areas" in self.dataset_params and \
-                str(recording_meta["locationId"]) in self.dataset_params["relevant_areas"]:
-            limits = self.dataset_params["relevant_areas"][str(recording_meta["locationId"])]
-            limits["x_lim"][0] = int(limits["x_lim"][0] / self.scale_down_factor)
-            limits["x_lim"][1] = int(limits["x_lim"][1] / self.scale_down_factor)
-            limits["y_lim"][0] = int(limits["y_lim"][0] / self.scale_down_factor)
-            limits["y_lim"][1] = int(limits["y_lim"][1] / self.scale_down_factor)
-            self.ax.set_xlim(limits["x_lim"])
-            self.ax.set_ylim(limits["y_lim"])
-
-        self.ax.axis('off')
-
-        # Initialize visualization options
-        self.current_frame = self.minimum_frame
-
-        # Do not start the animation by default
-        self.animation_running = False
-        self._set_controls_activation(True)
-
-        # Create animation instance•
-        self.track_animation = animation.FuncAnimation(self.fig, self._update_figure, interval=20, blit=True,
-                                                       init_func=self._clear_figure, cache_frame_data=False)
-
-        # Add listener to figure so that clicks on tracks open a plot window
-        self.fig.canvas.mpl_connect('pick_event', self._open_track_plots_window)
+    def render_frame(self, frame: int) -> np.ndarray:
+        """
+        Draw a frame and return the rendered figure, e.g. to write it to a video.
+        :param frame: Frame number
+        :return: RGB image of the figure in the shape [height, width, 3]
+        """
+        self.current_frame = frame
+        self._update_figure()
+        self.fig.canvas.draw()
+        return np.asarray(self.fig.canvas.buffer_rgba())[:, :, :3].copy()
 
     def show(self):
         """
@@ -241,12 +500,63 @@ class TrackVisualizer(object):
         # is called manually, draw all objects directly.
         animate = len(args) != 0
 
-        # First remove all existing drawings
-        self._clear_figure()
+        with instrumentation.timer("update_figure"):
+            if self.pooled_rendering:
+                plot_handles = self._update_pooled_artists(animate)
+            else:
+                # First remove all existing drawings
+                self._clear_figure()
+                plot_handles = self._create_track_artists(animate)
+                instrumentation.count("artists_created", len(plot_handles))
+        instrumentation.tick_frame()
+
+        # Draw current frame number
+        x = self.ax.get_xlim()[0] + 5
+        y = self.ax.get_ylim()[1] + int((self.ax.get_ylim()[0] - self.ax.get_ylim()[1]) * 0.05)
+        frame_text = "Frame: {}/{}".format(self.current_frame, self.maximum_frame)
+        if self.show_frame_stats:
+            frame_text += "   {:.1f} FPS, {:.1f} ms".format(instrumentation.fps,
+                                                            instrumentation.latency("update_figure"))
+        if self.pooled_rendering:
+            label_current_frame = self.label_current_frame
+            label_current_frame.set_position((x, y))
+            label_current_frame.set_text(frame_text)
+            label_current_frame.set_animated(animate)
+        else:
+            label_current_frame = self.ax.text(x, y, frame_text, fontsize=12, color="white", animated=animate)
+        plot_handles.append(label_current_frame)
+
+        # Update current frame
+        if self.current_frame == self.maximum_frame:
+            self.current_frame = self.minimum_frame
+            if self.playback_scheduler is not None:
+                self.playback_scheduler.start(self.current_frame)
+        elif self.animation_running:
+            if self.playback_scheduler is not None:
+                # Skip as many frames as needed to hold the playback rate
+                self.current_frame = self.playback_scheduler.next_frame(self.current_frame)
+            else:
+                # This is the "play-speed"
+                self.current_frame = min(self.current_frame + self.playback_speed, self.maximum_frame)
+
+            # Update the textbox to new current frame
+            self.textbox_frame.set_val(self.current_frame)
+
+        if not self.pooled_rendering:
+            self.plot_handles = plot_handles
+        return plot_handles
 
+    def _create_track_artists(self, animate: bool) -> list:
+        """
+        Create new artists for all tracks of the current frame.
+        :param animate: Whether the artists are animated, i.e. only drawn by blitting
+        :return: List of the created artists
+        """
         # Plot the bounding boxes, their text annotations and direction arrow
         plot_handles = []
-        for track_idx in self.frame_to_track_idxs[self.current_frame]:
+        track_idxs = self.frame_to_track_idxs[self.current_frame]
+        instrumentation.count("tracks_drawn", len(track_idxs))
+        for track_idx in track_idxs:
             track = self.tracks[track_idx]
 
             track_id = track["trackId"]
@@ -255,11 +565,7 @@ class TrackVisualizer(object):
             current_index = self.current_frame - initial_frame
 
             object_class = track_meta["class"]
-            if track["bboxVis"] is not None:
-                bounding_box = track["bboxVis"][current_index] / self.scale_down_factor
-            else:
-                bounding_box = None
-            center_points = track["centerVis"] / self.scale_down_factor
+            center_points, bounding_box = self._get_display_coordinates(track_idx, current_index)
             center_point = center_points[current_index]
 
             color = self.class_colors.get(object_class, self.class_colors["default"])
@@ -270,14 +576,7 @@ class TrackVisualizer(object):
 
             if self.config["show_bounding_box"]:
                 edge_color = None
-                bbox_color = color
-                for vehicle_key, vehicle_id in self.surrounding_vehicles_ids.items():
-                    if isinstance(vehicle_id, list) and track_id in vehicle_id:
-                        bbox_color = self.surrounding_vehicles_colors[vehicle_key]
-                        break
-                    elif vehicle_id == track_id:
-                        bbox_color = self.surrounding_vehicles_colors[vehicle_key]
-                        break
+                bbox_color = self._get_bbox_color(track_id, color)
 
                 if track_id == self.clicked_track_id:
                     edge_color = "red"
@@ -289,7 +588,7 @@ class TrackVisualizer(object):
                     else:
                         bbox = plt.Polygon(bounding_box, True, facecolor=bbox_color, edgecolor="k", **self.bbox_style)
                 else:
-                    bbox = plt.Circle(center_point, radius=2, facecolor=bbox_color)
+                    bbox = plt.Circle(center_point, radius=CIRCLE_RADIUS, facecolor=bbox_color)
 
                 bbox.set_animated(animate)
 
@@ -302,20 +601,7 @@ class TrackVisualizer(object):
 
             if self.config["show_orientation"] and bounding_box is not None:
                 # Add triangles that display the direction of the cars
-                triangle_factor = 0.25
-                a_x = bounding_box[3, 0] + ((bounding_box[2, 0] - bounding_box[3, 0]) * triangle_factor)
-                b_x = bounding_box[0, 0] + ((bounding_box[1, 0] - bounding_box[0, 0]) * triangle_factor)
-                c_x = bounding_box[0, 0] + ((bounding_box[3, 0] - bounding_box[0, 0]) * 0.5)
-                triangle_x_position = np.array([a_x, b_x, c_x])
-
-                a_y = bounding_box[3, 1] + ((bounding_box[2, 1] - bounding_box[3, 1]) * triangle_factor)
-                b_y = bounding_box[0, 1] + ((bounding_box[1, 1] - bounding_box[0, 1]) * triangle_factor)
-                c_y = bounding_box[0, 1] + ((bounding_box[3, 1] - bounding_box[0, 1]) * 0.5)
-                triangle_y_position = np.array([a_y, b_y, c_y])
-
-                # Differentiate between vehicles that drive on the upper or lower lanes
-                triangle_info = np.array([triangle_x_position, triangle_y_position])
-                polygon = plt.Polygon(np.transpose(triangle_info), True, **self.orientation_style)
+                polygon = plt.Polygon(self._get_orientation_triangle(bounding_box), True, **self.orientation_style)
                 polygon.set_animated(animate)
                 self.ax.add_patch(polygon)
                 plot_handles.append(polygon)
@@ -327,44 +613,22 @@ class TrackVisualizer(object):
                 self.ax.add_patch(centroid)
                 plot_handles.append(centroid)
                 if center_points.shape[0] > 0:
-                    plotted_past_line = plt.Polygon(center_points[0:current_index + 1:2], closed=False, color=color,
+                    past_trajectory, future_trajectory = self.trajectory_layer.split(track_idx, current_index)
+                    plotted_past_line = plt.Polygon(past_trajectory, closed=False, color=color,
                                                     fill=False, **self.trajectory_style)
                     plotted_past_line.set_animated(animate)
                     self.ax.add_patch(plotted_past_line)
                     plot_handles.append(plotted_past_line)
                     if self.config["show_future_trajectory"]:
                         # Check track direction
-                        plotted_centroids_future = plt.Polygon(center_points[current_index::2], closed=False,
+                        plotted_centroids_future = plt.Polygon(future_trajectory, closed=False,
                                                                fill=False, **self.future_trajectory_style)
                         plotted_centroids_future.set_animated(animate)
                         self.ax.add_patch(plotted_centroids_future)
                         plot_handles.append(plotted_centroids_future)
 
             # Compose annotation
-            annotation_text = ''
-            if self.config["annotate_track_id"]:
-                # Plot the text annotation
-                annotation_text = "ID{}".format(track_id)
-            if self.config["annotate_class"]:
-                if annotation_text != '':
-                    annotation_text += '|'
-                annotation_text += "{}".format(object_class[0])
-            if self.config["annotate_speed"]:
-                if annotation_text != '':
-                    annotation_text += '|'
-                current_velocity = np.sqrt(
-                    track["xVelocity"][current_index] ** 2 + track["yVelocity"][current_index] ** 2) * 3.6
-                annotation_text += "{:.2f}km/h".format(current_velocity)
-            if self.config["annotate_orientation"]:
-                if annotation_text != '':
-                    annotation_text += '|'
-                current_rotation = track["heading"][current_index]
-                annotation_text += "Deg%.2f" % current_rotation
-            if self.config["annotate_age"]:
-                if annotation_text != '':
-                    annotation_text += '|'
-                age = track_meta["numFrames"]
-                annotation_text += "Age%d/%d" % (current_index + 1, age)
+            annotation_text = self._get_annotation_text(track, track_meta, current_index)
 
             if annotation_text:
                 text_patch = self.ax.text(center_point[0], center_point[1] - 2.5, annotation_text,
@@ -376,31 +640,311 @@ class TrackVisualizer(object):
                 text_patch.track_id = track["trackId"]
 
                 plot_handles.append(text_patch)
+        return plot_handles
 
-        # Draw current frame number
-        x = self.ax.get_xlim()[0] + 5
-        y = self.ax.get_ylim()[1] + int((self.ax.get_ylim()[0] - self.ax.get_ylim()[1]) * 0.05)
-        label_current_frame = self.ax.text(x, y, "Frame: {}/{}".format(self.current_frame, self.maximum_frame),
-                                           fontsize=12, color="white", animated=animate)
-        plot_handles.append(label_current_frame)
+    def _create_pooled_artists(self):
+        """
+        Create the persistent artists of the pooled rendering mode. All bboxes, orientation triangles, centroids and
+        trajectories are drawn by one collection each, and the texts are taken from a pool of text artists.
+        """
+        # Objects without a bbox and the centroids are drawn as polygons, so that their radius is given in data units
+        self.bbox_collection = PolyCollection([], alpha=self.bbox_style["alpha"], zorder=self.bbox_style["zorder"],
+                                              picker=True)
+        self.circle_collection = PolyCollection([], edgecolors="none", zorder=1, picker=True)
+        # Dots have a fixed size on screen, so that they stay visible when zoomed out
+        self.dot_collection = self.ax.scatter(np.zeros(0), np.zeros(0), s=DOT_SIZE, edgecolors="none",
+                                              zorder=self.bbox_style["zorder"], picker=True)
+        self.orientation_collection = PolyCollection([], facecolors=self.orientation_style["facecolor"],
+                                                     edgecolors=self.orientation_style["edgecolor"],
+                                                     linewidths=self.orientation_style["lw"],
+                                                     alpha=self.orientation_style["alpha"],
+                                                     zorder=self.orientation_style["zorder"])
+        self.centroid_collection = PolyCollection([], edgecolors=self.centroid_style["edgecolor"],
+                                                  linewidths=self.centroid_style["lw"],
+                                                  alpha=self.centroid_style["alpha"],
+                                                  zorder=self.centroid_style["zorder"])
+        self.trajectory_collection = LineCollection([], **self.trajectory_style)
+        self.future_trajectory_collection = LineCollection([], **self.future_trajectory_style)
+        self.pooled_collections = [self.bbox_collection, self.circle_collection, self.dot_collection,
+                                   self.orientation_collection, self.centroid_collection, self.trajectory_collection,
+                                   self.future_trajectory_collection]
+        for collection in self.pooled_collections:
+            # The track ids of the items of a collection are used to find the clicked track
+            collection.track_ids = np.zeros(0, dtype=np.int64)
+            if collection is not self.dot_collection:
+                self.ax.add_collection(collection, autolim=False)
+
+        self.text_pool = []
+        self.label_current_frame = self.ax.text(0, 0, "", fontsize=12, color="white")
+
+    def _get_pooled_text(self, index: int):
+        """
+        Get a text artist of the pool, which is created if the pool is too small.
+        """
+        while len(self.text_pool) <= index:
+            text_patch = self.ax.text(0, 0, "", bbox={"fc": "w", **self.text_box_style}, **self.text_style)
+            self.text_pool.append(text_patch)
+        return self.text_pool[index]
 
-        # Update current frame
-        if self.current_frame == self.maximum_frame:
-            self.current_frame = self.minimum_frame
-        elif self.animation_running:
-            # This is the "play-speed"
-            self.current_frame = min(self.current_frame + self.playback_speed, self.maximum_frame)
+    def _prepare_frame(self, frame: int, viewport: tuple = None) -> dict:
+        """
+        Prepare the geometry, colors and annotations of all tracks of a frame for the pooled rendering. Only the tracks
+        within the visible area are prepared. As the state of the visualizer is not changed, frames can be prepared in
+        a background thread during playback.
+        :param frame: Frame number
+        :param viewport: Visible area as given by _get_viewport. By default, the visible area of the last drawn frame
+        :return: Dictionary of the prepared data
+        """
+        viewport = viewport if viewport is not None else self.viewport
+        track_idxs, object_visible, trajectory_visible = self._cull_tracks(frame, viewport)
+        current_indices = frame - self.track_initial_frames[track_idxs]
+        prepared = dict(frame=frame, viewport=viewport, track_idxs=track_idxs.tolist(),
+                        track_ids=self.tracks.track_ids[track_idxs].tolist(), current_indices=current_indices.tolist(),
+                        bboxes=[], bbox_colors=[], bbox_track_ids=[], circles=[], circle_colors=[],
+                        circle_track_ids=[], dots=[], dot_colors=[], dot_track_ids=[], triangles=[], centroids=[],
+                        centroid_colors=[], trajectories=[], trajectory_colors=[], future_trajectories=[],
+                        annotations=[])
+        full_detail = viewport[4]
+        show_trajectory = self.config["show_trajectory"]
+        # Tracks outside the visible area are skipped, unless their trajectory is visible
+        for i in np.flatnonzero(object_visible | (show_trajectory & trajectory_visible)):
+            track_idx, track_id, current_index = track_idxs[i], prepared["track_ids"][i], current_indices[i]
+            track_meta = self.tracks_meta[track_idx]
 
-            # Update the textbox to new current frame
-            self.textbox_frame.set_val(self.current_frame)
+            center_points, bounding_box = self._get_display_coordinates(track_idx, current_index)
+            center_point = center_points[current_index]
 
-        self.plot_handles = plot_handles
-        return plot_handles
+            color = self.class_colors.get(track_meta["class"], self.class_colors["default"])
+
+            if show_trajectory:
+                past_trajectory, future_trajectory = self.trajectory_layer.split(track_idx, current_index)
+                prepared["trajectories"].append(past_trajectory)
+                prepared["trajectory_colors"].append(color)
+                if self.config["show_future_trajectory"]:
+                    prepared["future_trajectories"].append(future_trajectory)
+
+            if not object_visible[i]:
+                continue
+
+            if not full_detail:
+                # When zoomed out, the objects are only drawn as dots
+                if self.config["show_bounding_box"] or show_trajectory:
+                    prepared["dots"].append(center_point)
+                    prepared["dot_colors"].append(color)
+                    prepared["dot_track_ids"].append(track_id)
+                continue
+
+            if self.config["show_bounding_box"]:
+                # The colors of surrounding vehicles are applied when the frame is drawn
+                if bounding_box is not None:
+                    prepared["bboxes"].append(bounding_box)
+                    prepared["bbox_colors"].append(color)
+                    prepared["bbox_track_ids"].append(track_id)
+                else:
+                    prepared["circles"].append(center_point + CIRCLE_VERTICES * CIRCLE_RADIUS)
+                    prepared["circle_colors"].append(color)
+                    prepared["circle_track_ids"].append(track_id)
+
+            if self.config["show_orientation"] and bounding_box is not None:
+                prepared["triangles"].append(self._get_orientation_triangle(bounding_box))
+
+            if show_trajectory:
+                prepared["centroids"].append(center_point + CIRCLE_VERTICES * self.centroid_style["radius"])
+                prepared["centroid_colors"].append(color)
+
+            annotation_text = self._get_annotation_text(self.tracks[track_idx], track_meta, current_index)
+            if annotation_text:
+                prepared["annotations"].append((center_point, annotation_text, color, track_id))
+        return prepared
+
+    def _update_pooled_artists(self, animate: bool) -> list:
+        """
+        Update the persistent artists to the tracks of the current frame. Only the vertices, colors and visibility
+        of the artists are changed, so that no artists are created or removed during playback.
+        :param animate: Whether the artists are animated, i.e. only drawn by blitting
+        :return: List of all pooled artists
+        """
+        self.viewport = self._get_viewport()
+        if self.playback_scheduler is not None:
+            prepared = self.playback_scheduler.prepared_frame(self.current_frame)
+            # Frames prepared before the axes were zoomed or panned are prepared again
+            if prepared["viewport"] != self.viewport:
+                prepared = self._prepare_frame(self.current_frame)
+        else:
+            prepared = self._prepare_frame(self.current_frame)
+
+        if self.clicked_track_id is not None and self.clicked_track_id in prepared["track_ids"]:
+            i = prepared["track_ids"].index(self.clicked_track_id)
+            self._find_surrounding_vehicles(prepared["current_indices"][i], self.tracks[prepared["track_idxs"][i]],
+                                            show_log=False)
+
+        instrumentation.count("tracks_drawn", len(prepared["bboxes"]) + len(prepared["circles"]) +
+                              len(prepared["dots"]))
+
+        self.bbox_collection.set_verts(prepared["bboxes"])
+        self.bbox_collection.set_facecolors([self._get_bbox_color(track_id, color) for track_id, color
+                                             in zip(prepared["bbox_track_ids"], prepared["bbox_colors"])])
+        self.bbox_collection.set_edgecolors(["red" if track_id == self.clicked_track_id else "k"
+                                             for track_id in prepared["bbox_track_ids"]])
+        self.bbox_collection.track_ids = np.array(prepared["bbox_track_ids"], dtype=np.int64)
+        self.circle_collection.set_verts(prepared["circles"])
+        self.circle_collection.set_facecolors([self._get_bbox_color(track_id, color) for track_id, color
+                                               in zip(prepared["circle_track_ids"], prepared["circle_colors"])])
+        self.circle_collection.track_ids = np.array(prepared["circle_track_ids"], dtype=np.int64)
+        self.dot_collection.set_offsets(np.reshape(prepared["dots"], (-1, 2)))
+        self.dot_collection.set_facecolors([self._get_bbox_color(track_id, color) for track_id, color
+                                            in zip(prepared["dot_track_ids"], prepared["dot_colors"])])
+        self.dot_collection.track_ids = np.array(prepared["dot_track_ids"], dtype=np.int64)
+        self.orientation_collection.set_verts(prepared["triangles"])
+        self.centroid_collection.set_verts(prepared["centroids"])
+        self.centroid_collection.set_facecolors(prepared["centroid_colors"])
+        self.trajectory_collection.set_segments(prepared["trajectories"])
+        self.trajectory_collection.set_colors(prepared["trajectory_colors"])
+        self.future_trajectory_collection.set_segments(prepared["future_trajectories"])
+        for collection in self.pooled_collections:
+            collection.set_animated(animate)
+
+        # Reuse the text artists and hide the unused ones
+        annotations = prepared["annotations"]
+        for i, (center_point, annotation_text, color, track_id) in enumerate(annotations):
+            text_patch = self._get_pooled_text(i)
+            text_patch.set_position((center_point[0], center_point[1] - 2.5))
+            text_patch.set_text(annotation_text)
+            text_patch.get_bbox_patch().set_facecolor(color)
+            text_patch.set_visible(True)
+            # Make text clickable to open track info window
+            text_patch.track_id = track_id
+        for text_patch in self.text_pool[len(annotations):]:
+            text_patch.set_visible(False)
+        for text_patch in self.text_pool:
+            text_patch.set_animated(animate)
+
+        return self.pooled_collections + self.text_pool
+
+    def _compute_culling_bounds(self):
+        """
+        Compute the bounds of the trajectories and the size of the objects in display coordinates, which are used to
+        skip the tracks outside the visible area and to choose the level of detail.
+        """
+        self.track_initial_frames = np.array([track_meta["initialFrame"] for track_meta in self.tracks_meta],
+                                             dtype=np.int64)
+        # Bounds of the trajectory of every track ignoring missing values in the shape [num_tracks, 2]
+        track_starts = self.track_offsets[:-1]
+        self.trajectory_minima = np.fmin.reduceat(self.center_points_display, track_starts, axis=0)
+        self.trajectory_maxima = np.fmax.reduceat(self.center_points_display, track_starts, axis=0)
+
+        # Distances of the bbox corners to the centers. Objects without a bbox are drawn as circles
+        row_has_bbox = np.repeat(self.track_has_bbox, np.diff(self.track_offsets))
+        corner_offsets = self.bboxes_display[row_has_bbox] - self.center_points_display[row_has_bbox, np.newaxis, :]
+        corner_distances = np.hypot(corner_offsets[..., 0], corner_offsets[..., 1])
+        corner_distances = corner_distances[np.isfinite(corner_distances)]
+        # Margin of the visible area, so that partly visible objects are drawn as well
+        self.cull_margin = max(CIRCLE_RADIUS, corner_distances.max()) if len(corner_distances) > 0 else CIRCLE_RADIUS
+        # Typical size of an object given by the median bbox diagonal
+        self.typical_object_size = 2 * np.median(corner_distances) if len(corner_distances) > 0 else \
+            2 * CIRCLE_RADIUS
+
+    def _get_viewport(self) -> tuple:
+        """
+        Get the visible area of the main axes and whether objects are drawn in full detail at the current zoom level.
+        :return: Tuple of (x_min, x_max, y_min, y_max, full detail) with the limits in display coordinates
+        """
+        x_limits, y_limits = self.ax.get_xlim(), self.ax.get_ylim()
+        pixels_per_unit = self.ax.bbox.width / max(abs(x_limits[1] - x_limits[0]), 1e-6)
+        full_detail = not self.config["level_of_detail"] or \
+            self.typical_object_size * pixels_per_unit >= MIN_OBJECT_SIZE_PX
+        return min(x_limits), max(x_limits), min(y_limits), max(y_limits), full_detail
+
+    def _cull_tracks(self, frame: int, viewport: tuple):
+        """
+        Find the tracks of a frame and test whether their object and their trajectory lie within the visible area.
+        :param frame: Frame number
+        :param viewport: Visible area as given by _get_viewport
+        :return: Tuple of (track idxs, mask of visible objects, mask of visible trajectories)
+        """
+        track_idxs = self.frame_to_track_idxs[frame]
+        x_min, x_max = viewport[0] - self.cull_margin, viewport[1] + self.cull_margin
+        y_min, y_max = viewport[2] - self.cull_margin, viewport[3] + self.cull_margin
+
+        centers = self.center_points_display[self.track_offsets[track_idxs] + frame -
+                                             self.track_initial_frames[track_idxs]]
+        object_visible = (centers[:, 0] >= x_min) & (centers[:, 0] <= x_max) & \
+                         (centers[:, 1] >= y_min) & (centers[:, 1] <= y_max)
+
+        minima, maxima = self.trajectory_minima[track_idxs], self.trajectory_maxima[track_idxs]
+        trajectory_visible = (minima[:, 0] <= x_max) & (maxima[:, 0] >= x_min) & \
+                             (minima[:, 1] <= y_max) & (maxima[:, 1] >= y_min)
+        return track_idxs, object_visible, trajectory_visible
+
+    def _get_display_coordinates(self, track_idx: int, current_index: int):
+        """
+        Get the scaled display coordinates of a track.
+        :param track_idx: Index of the track
+        :param current_index: Index of the current frame within the track
+        :return: View of the center points of the whole track and the bbox at the current frame (None, if the track
+                 has no bbox)
+        """
+        start, end = self.track_offsets[track_idx], self.track_offsets[track_idx + 1]
+        bounding_box = self.bboxes_display[start + current_index] if self.track_has_bbox[track_idx] else None
+        return self.center_points_display[start:end], bounding_box
+
+    def _get_bbox_color(self, track_id: int, color: str) -> str:
+        """
+        Get the color of a bbox, which highlights the surrounding vehicles of the clicked track.
+        """
+        return self.highlighted_colors.get(track_id, color)
+
+    @staticmethod
+    def _get_orientation_triangle(bounding_box: np.ndarray) -> np.ndarray:
+        """
+        Get the corners of a triangle that displays the direction of a vehicle.
+        :param bounding_box: Corners of the bbox in the shape [4, 2]
+        :return: Corners of the triangle in the shape [3, 2]
+        """
+        triangle_factor = 0.25
+        return np.array([bounding_box[3] + (bounding_box[2] - bounding_box[3]) * triangle_factor,
+                         bounding_box[0] + (bounding_box[1] - bounding_box[0]) * triangle_factor,
+                         bounding_box[0] + (bounding_box[3] - bounding_box[0]) * 0.5])
+
+    def _get_annotation_text(self, track: dict, track_meta: dict, current_index: int) -> str:
+        """
+        Compose the text annotation of a track as given by the annotate_* options.
+        """
+        track_id = track["trackId"]
+        object_class = track_meta["class"]
+        annotation_text = ''
+        if self.config["annotate_track_id"]:
+            # Plot the text annotation
+            annotation_text = "ID{}".format(track_id)
+        if self.config["annotate_class"]:
+            if annotation_text != '':
+                annotation_text += '|'
+            annotation_text += "{}".format(object_class[0])
+        if self.config["annotate_speed"]:
+            if annotation_text != '':
+                annotation_text += '|'
+            current_velocity = np.sqrt(
+                track["xVelocity"][current_index] ** 2 + track["yVelocity"][current_index] ** 2) * 3.6
+            annotation_text += "{:.2f}km/h".format(current_velocity)
+        if self.config["annotate_orientation"]:
+            if annotation_text != '':
+                annotation_text += '|'
+            current_rotation = track["heading"][current_index]
+            annotation_text += "Deg%.2f" % current_rotation
+        if self.config["annotate_age"]:
+            if annotation_text != '':
+                annotation_text += '|'
+            age = track_meta["numFrames"]
+            annotation_text += "Age%d/%d" % (current_index + 1, age)
+        return annotation_text
 
     def _clear_figure(self):
         """
         Remove all dynamic objects (tracks including texts, bboxes, trajectories etc.)
         """
+        if self.pooled_rendering:
+            # The pooled artists are kept and only updated
+            return self.pooled_collections + self.text_pool
         for figure_object in self.plot_handles:
             if isinstance(figure_object, list):
                 figure_object[0].remove()
@@ -428,6 +972,23 @@ class TrackVisualizer(object):
         Handle updates in the frame textbox as well as keyboard hotkeys.
         """
 
+        if self.textbox_recording is not None and self.textbox_recording.capturekeystrokes:
+            if evt.key == "enter":
+                self.switch_recording(self._get_session_recording_name(self.textbox_recording.text))
+            return
+
+        # Switch to the next or previous recording of the session
+        if self.session is not None and evt.key in ("pageup", "pagedown"):
+            recording_name = self.session.neighbor(self.recording_name, 1 if evt.key == "pagedown" else -1)
+            if recording_name is not None:
+                self.switch_recording(recording_name)
+            else:
+                logger.warning("There is no {} recording in the session.",
+                               "next" if evt.key == "pagedown" else "previous")
+            return
+
+        previous_frame = self.current_frame
+
         # When the textbox is focused, only accept the keypress for "enter" as we use this for the submission of the
         # current frame. This is due to the fact that when losing focus of the textbox, the textbox submits its value
         # anyways. However, we only want to update the visualization, when the user confirms it with a "enter".
@@ -453,6 +1014,21 @@ class TrackVisualizer(object):
         elif evt.key == " ":
             self._start_stop_animation(None)
 
+        # Continue the playback from the frame jumped to
+        if self.animation_running and self.playback_scheduler is not None and self.current_frame != previous_frame:
+            self.playback_scheduler.start(self.current_frame)
+
+    def _get_session_recording_name(self, text: str) -> str:
+        """
+        Get the name of a recording of the session from an entered text, which may omit the leading zero.
+        """
+        text = text.strip()
+        for recording_name in self.session.recordings:
+            if recording_name == text or (text.isdigit() and recording_name.isdigit() and
+                                          int(recording_name) == int(text)):
+                return recording_name
+        return text
+
     def _on_click_button_next(self, _):
         if self.current_frame + 1 < self.maximum_frame:
             self.current_frame = self.current_frame + 1
@@ -485,6 +1061,8 @@ class TrackVisualizer(object):
 
             self._set_controls_activation(False)
             self.animation_running = True
+            if self.playback_scheduler is not None:
+                self.playback_scheduler.start(self.current_frame)
         else:
             # Stop animation
             self.ax_button_play.images[0].set_data(self.play_image)
@@ -519,25 +1097,23 @@ class TrackVisualizer(object):
             return
         # Get clicked artist and check if it belongs to a shown track
         artist = event.artist
-        if "track_id" not in artist.__dict__:
-            return
-        track_id = artist.track_id
-
-        # Get track by id
-        for track in self.tracks:
-            if track["trackId"] == track_id:
-                track = track
-                break
+        if "track_ids" in artist.__dict__:
+            # Collections of the pooled rendering contain the track id of every item
+            if len(event.ind) == 0 or len(artist.track_ids) == 0:
+                return
+            track_id = int(artist.track_ids[event.ind[-1]])
+        elif "track_id" in artist.__dict__:
+            track_id = int(artist.track_id)
         else:
-            logger.error("No track with the ID {} was found. Nothing to show.", track_id)
             return
 
-        # Get track meta by id
-        track_meta = [track_meta for track_meta in self.tracks_meta if track_meta["trackId"] == track_id]
-        if len(track_meta) != 1:
-            logger.error("No track meta information was found for the ID {} was found. Nothing to show.", track_id)
+        # Get track and track meta by id. Both are in the same order, as checked on initialization
+        track_idx = self.tracks.index_of(track_id)
+        if track_idx is None:
+            logger.error("No track with the ID {} was found. Nothing to show.", track_id)
             return
-        track_meta = track_meta[0]
+        track = self.tracks[track_idx]
+        track_meta = self.tracks_meta[track_idx]
 
         # Get information of the selected track
         centroids = track["center"]
@@ -654,7 +1230,7 @@ class TrackVisualizer(object):
 
         for extra_plot_key, extra_plot_name in extra_plots.items():
             if track.get(extra_plot_key, None) is not None:
-                plot_data = track[extra_plot_key]
+                plot_data = np.array(track[extra_plot_key])
                 borders = None
 
                 if extra_plot_key == "leadId":
@@ -689,11 +1265,20 @@ class TrackVisualizer(object):
     def _find_surrounding_vehicles(self, current_frame: int, track: dict, show_log: bool = True):
         track_id = track["trackId"]
         header_log = False
+        highlighted_colors = {}
         for surrounding_vehicle_key in self.surrounding_vehicles_ids.keys():
             surrounding_id = track.get(surrounding_vehicle_key, {current_frame: -1})[current_frame]
+            if isinstance(surrounding_id, np.ndarray):
+                # Semicolon separated ids (e.g. alongside vehicles) are given as NaN padded rows
+                surrounding_id = [int(v) for v in surrounding_id[~np.isnan(surrounding_id)]]
             if isinstance(surrounding_id, list) and len(surrounding_id) == 0:
                 surrounding_id = -1
             self.surrounding_vehicles_ids[surrounding_vehicle_key] = surrounding_id
+            # If a vehicle has several roles, the color of the first role is used
+            vehicle_color = self.surrounding_vehicles_colors[surrounding_vehicle_key]
+            for vehicle_id in (surrounding_id if isinstance(surrounding_id, list) else [surrounding_id]):
+                if vehicle_id != -1 and not np.isnan(vehicle_id):
+                    highlighted_colors.setdefault(int(vehicle_id), vehicle_color)
             if show_log and surrounding_id != -1:
                 if not header_log:
                     logger.info(f"--- Surrounding vehicles for track {track_id} ---")
@@ -702,6 +1287,7 @@ class TrackVisualizer(object):
                 logger.info(f"{surrounding_vehicle_key} "
                             f"({self.surrounding_vehicles_colors[surrounding_vehicle_key]}) "
                             f"surrounding vehicle for track {track_id}: {surrounding_id}")
+        self.highlighted_colors = highlighted_colors
 
     def _on_close_track_plots_window(self, _, track_id: int):
         if track_id in self.track_info_figures:
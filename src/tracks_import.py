@@ -1,133 +1,960 @@
-import pandas
 import glob
+import hashlib
+import io
+import json
+import os
+import shutil
+import pandas
 import numpy as np
 from loguru import logger
-from typing import List, Tuple
+from collections.abc import Mapping, Sequence
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from instrumentation import instrumentation, timed
 
+# Columns of the tracks csv files containing semicolon separated lists (e.g. "12;13" for two overlapping lanelets)
+SEMI_COLON_LIST_COLUMNS = ["leftAlongsideId", "rightAlongsideId", "laneletId", "latLaneCenterOffset",
+                           "lonLaneletPos", "laneletLength", "laneWidth"]
+N_MAX_OVERLAPPING_LANELETS = 5
 
-def read_all_recordings_from_csv(base_path: str = "../data/") -> List[dict]:
+
+def read_all_recordings_from_csv(base_path: str = "../data/", workers: int = 1, **read_options) -> List[dict]:
     """
     Read tracks and meta information for all recordings in a directory
-    Warning: This might need a lot of memory!
+    Warning: This might need a lot of memory! Use iter_recordings to process one recording after another instead.
+    :param base_path: Directory containing all csv files of the dataset
+    :param workers: Number of processes used to read the recordings in parallel. If 1, the recordings are read
+                    one after another. If None, one process per CPU is used
+    :param read_options: Further options passed to read_from_csv, e.g. use_cache, columns or dtype
+    :return: List of recordings represented as dictionary of tracks, tracks meta and recording meta each. Recordings,
+             which could not be read, are skipped
+    """
+    recording_files = find_recording_files(base_path)
+
+    results = {}
+    if workers == 1:
+        for i, files in enumerate(recording_files):
+            results[i] = _read_recording(files, read_options)
+            _log_recording_progress(files, results[i], len(results), len(recording_files))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(_read_recording, files, read_options): i
+                       for i, files in enumerate(recording_files)}
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    results[i] = future.result()
+                except Exception:
+                    # E.g. the worker process was killed while reading the recording
+                    logger.exception("The process reading the csv files {}, {} and {} failed.", *recording_files[i])
+                    results[i] = None
+                _log_recording_progress(recording_files[i], results[i], len(results), len(recording_files))
+
+    # Return the recordings in their original order
+    return [results[i] for i in range(len(recording_files)) if results[i] is not None]
+
+
+def iter_recordings(base_path: str = "../data/", prefetch: bool = True, **read_options) -> Iterator[dict]:
+    """
+    Iterate over the tracks and meta information of all recordings in a directory. In contrast to
+    read_all_recordings_from_csv, only the current recording (and the prefetched next one) are kept in memory.
     :param base_path: Directory containing all csv files of the dataset
-    :return: Tuple of tracks, tracks meta and recording meta
+    :param prefetch: Read the next recording in a background thread while the current one is processed
+    :param read_options: Further options passed to read_from_csv, e.g. use_cache, columns or dtype
+    :return: Generator of recordings represented as dictionary of tracks, tracks meta and recording meta each.
+             Recordings, which could not be read, are skipped
+    """
+    recording_files = find_recording_files(base_path)
+
+    if not prefetch:
+        for i, files in enumerate(recording_files):
+            recording = _read_recording(files, read_options)
+            _log_recording_progress(files, recording, i + 1, len(recording_files))
+            if recording is not None:
+                yield recording
+        return
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        next_recording = None
+        for i, files in enumerate(recording_files):
+            if next_recording is None:
+                next_recording = executor.submit(_read_recording, files, read_options)
+            recording = next_recording.result()
+
+            # Start reading the next recording before handing over the current one
+            next_recording = executor.submit(_read_recording, recording_files[i + 1], read_options) \
+                if i + 1 < len(recording_files) else None
+            _log_recording_progress(files, recording, i + 1, len(recording_files))
+            try:
+                if recording is not None:
+                    yield recording
+            except GeneratorExit:
+                if next_recording is not None:
+                    next_recording.cancel()
+                raise
+            del recording
+
+
+def find_recording_files(base_path: str) -> List[Tuple[str, str, str]]:
+    """
+    Find the csv files of all recordings in a directory
+    :param base_path: Directory containing all csv files of the dataset
+    :return: List of (tracks file, tracks meta file, recording meta file) for every recording sorted by the name
     """
     tracks_files = sorted(glob.glob(base_path + "*_tracks.csv"))
     tracks_meta_files = sorted(glob.glob(base_path + "*_tracksMeta.csv"))
     recording_meta_files = sorted(glob.glob(base_path + "*_recordingMeta.csv"))
+    return list(zip(tracks_files, tracks_meta_files, recording_meta_files))
+
+
+def _read_recording(files: Tuple[str, str, str], read_options: dict) -> Optional[dict]:
+    """
+    Read a single recording and catch all errors, so that a corrupt recording does not abort reading the others.
+    """
+    try:
+        tracks, tracks_meta, recording_meta = read_from_csv(*files, **read_options)
+    except Exception:
+        logger.exception("Could not read the csv files {}, {} and {}. Skipping the recording.", *files)
+        return None
+    return {"tracks": tracks, "tracks_meta": tracks_meta, "recording_meta": recording_meta}
 
-    recordings = []
-    for track_file, tracks_meta_file, recording_meta_file in zip(tracks_files,
-                                                                 tracks_meta_files,
-                                                                 recording_meta_files):
-        logger.info("Loading csv files {}, {} and {}", track_file, tracks_meta_file, recording_meta_file)
-        tracks, tracks_meta, recording_meta = read_from_csv(track_file, tracks_meta_file, recording_meta_file)
-        recordings.append({"tracks": tracks, "tracks_meta": tracks_meta, "recording_meta": recording_meta})
 
-    return recordings
+def _log_recording_progress(files: Tuple[str, str, str], recording: Optional[dict], num_done: int, num_total: int):
+    status = "Loaded" if recording is not None else "Failed to load"
+    logger.info("{} csv files {}, {} and {} ({}/{})", status, *files, num_done, num_total)
 
 
+@timed("read_recording")
 def read_from_csv(tracks_file: str, tracks_meta_file: str,
-                  recording_meta_file: str, include_px_coordinates: bool=False) -> Tuple[List[dict], List[dict], List[dict]]:
+                  recording_meta_file: str, include_px_coordinates: bool=False,
+                  use_cache: bool = True, cache_dir: Optional[str] = None, max_cache_size: Optional[int] = None,
+                  columns: Optional[List[str]] = None, dtype: Optional[np.dtype] = None,
+                  classes: Optional[List[str]] = None,
+                  track_ids: Optional[List[int]] = None,
+                  frame_range: Optional[Tuple[int, int]] = None) -> Tuple["RecordingStore", List[dict], dict]:
     """
-    This method reads tracks and meta data for a single recording from csv files
+    This method reads tracks and meta data for a single recording from csv files. If any of the filters (classes,
+    track_ids or frame_range) is given, the filters are evaluated on the tracks meta first and only the matching rows
+    of the tracks file are parsed. The returned tracks meta then only contains the matching tracks, and the frames
+    of each track are clipped to the frame range.
     :param tracks_file: Path of a tracks csv file
     :param tracks_meta_file: Path of a tracks meta csv file
     :param recording_meta_file: Path of a recording meta csv file
+    :param include_px_coordinates: Set to true, if the tracks are used for the visualizer
+    :param use_cache: Load the parsed tracks from an on-disk cache if possible and store them there otherwise
+    :param cache_dir: Directory of the cache. By default, a directory next to the tracks file is used
+    :param max_cache_size: Maximum size (bytes) of all entries of the cache. By default, the cache is limited to 8 GB
+    :param columns: Columns of the tracks file to load. By default, all columns are loaded
+    :param dtype: Data type of all floating point columns (e.g. np.float32). By default, np.float64 is used
+    :param classes: Only load tracks of these classes (e.g. ["pedestrian", "bicycle"])
+    :param track_ids: Only load tracks with these ids
+    :param frame_range: Only load the frames within this range given as (first frame, last frame)
     :return: Tuple of (tracks, tracks meta, recording meta)
     """
     recording_meta = read_recording_meta(recording_meta_file)
     tracks_meta = read_tracks_meta(tracks_meta_file)
-    tracks = read_tracks(tracks_file, recording_meta, include_px_coordinates)
+    selection = None
+    if classes is not None or track_ids is not None or frame_range is not None:
+        selection = TrackSelection(tracks_meta, classes, track_ids, frame_range)
+        tracks_meta = selection.tracks_meta
+    tracks = read_tracks(tracks_file, recording_meta, include_px_coordinates, use_cache, cache_dir, max_cache_size,
+                         columns, dtype, selection)
     return tracks, tracks_meta, recording_meta
 
 
-def read_tracks(tracks_file: str, recording_meta: dict, include_px_coordinates: bool=False) -> List[dict]:
+def read_tracks(tracks_file: str, recording_meta: dict, include_px_coordinates: bool=False,
+                use_cache: bool = True, cache_dir: Optional[str] = None, max_cache_size: Optional[int] = None,
+                columns: Optional[List[str]] = None, dtype: Optional[np.dtype] = None,
+                selection: Optional["TrackSelection"] = None) -> "RecordingStore":
     """
     Read tracks from a csv file
     :param tracks_file: Path of a tracks csv file
     :param recording_meta: Loaded meta of the corresponding recording
     :param include_px_coordinates: Set to true, if the tracks are used for the visualizer
-    :return: A list of tracks represented as dictionary each
-    """
-    # To extract every track, group the rows by the track id
-    n_max_overlapping_lanelets = 5
-
-    def semi_colon_int_list_to_list(semi_colon_list):
-        output_list = [np.nan] * n_max_overlapping_lanelets
-        if semi_colon_list:
-            if ";" in semi_colon_list:
-                for i, v in enumerate(semi_colon_list.split(";")):
-                    output_list[i] = int(v)
-                # output_list = [int(v) for v in semi_colon_list.split(";")]
-            else:
-                output_list[0] = int(semi_colon_list)
-        return output_list
-
-    def semi_colon_float_list_to_list(semi_colon_list):
-        output_list = [np.nan] * n_max_overlapping_lanelets
-        if semi_colon_list:
-            if ";" in semi_colon_list:
-                for i, v in enumerate(semi_colon_list.split(";")):
-                    output_list[i] = float(v)
-                # output_list = [int(v) for v in semi_colon_list.split(";")]
-            else:
-                output_list[0] = float(semi_colon_list)
-        return output_list
-
-    raw_tracks = pandas.read_csv(tracks_file,
-                                 converters={"leftAlongsideId": semi_colon_int_list_to_list,
-                                             "rightAlongsideId": semi_colon_int_list_to_list,
-                                             "laneletId": semi_colon_int_list_to_list,
-                                             "latLaneCenterOffset": semi_colon_float_list_to_list,
-                                             "lonLaneletPos": semi_colon_float_list_to_list,
-                                             "laneletLength": semi_colon_float_list_to_list,
-                                             "laneWidth": semi_colon_float_list_to_list}
-                                 ).groupby(["trackId"], sort=True)
+    :param use_cache: Load the parsed tracks from an on-disk cache if possible and store them there otherwise
+    :param cache_dir: Directory of the cache. By default, a directory next to the tracks file is used
+    :param max_cache_size: Maximum size (bytes) of all entries of the cache. By default, the cache is limited to 8 GB
+    :param columns: Columns of the tracks file to load. By default, all columns are loaded
+    :param dtype: Data type of all floating point columns (e.g. np.float32). By default, np.float64 is used
+    :param selection: Only read the rows of these tracks and frames. Selected tracks are not cached, as reading
+                      them is fast anyway
+    :return: The tracks in a columnar store, which can be indexed like a list of tracks represented as dictionary each
+    """
+    if not use_cache or selection is not None:
+        return parse_tracks(tracks_file, recording_meta, include_px_coordinates, columns, dtype, selection)
+
+    cache = TracksCache(cache_dir if cache_dir is not None else os.path.join(os.path.dirname(tracks_file),
+                                                                              TracksCache.DEFAULT_DIRECTORY),
+                        max_cache_size if max_cache_size is not None else TracksCache.DEFAULT_MAX_SIZE)
+    options = {"columns": sorted(columns) if columns is not None else None,
+               "dtype": np.dtype(dtype).name if dtype is not None else None}
+    key = cache.get_key(tracks_file, options)
+    with instrumentation.timer("load_cache"):
+        tracks = cache.load(key)
+    if tracks is None:
+        tracks = parse_tracks(tracks_file, recording_meta, include_px_coordinates, columns, dtype)
+        cache.save(key, tracks_file, options, tracks)
+    else:
+        add_derived_columns(tracks, recording_meta, include_px_coordinates)
+    return tracks
+
+
+@timed("parse_tracks")
+def parse_tracks(tracks_file: str, recording_meta: dict, include_px_coordinates: bool=False,
+                 columns: Optional[List[str]] = None, dtype: Optional[np.dtype] = None,
+                 selection: Optional["TrackSelection"] = None) -> "RecordingStore":
+    """
+    Parse tracks from a csv file without using the cache. Derived fields (e.g. bbox) are only calculated, if all
+    columns needed for them are loaded.
+    :param tracks_file: Path of a tracks csv file
+    :param recording_meta: Loaded meta of the corresponding recording
+    :param include_px_coordinates: Set to true, if the tracks are used for the visualizer
+    :param columns: Columns of the tracks file to load. By default, all columns are loaded
+    :param dtype: Data type of all floating point columns (e.g. np.float32). By default, np.float64 is used
+    :param selection: Only parse the rows of these tracks and frames
+    :return: The tracks in a columnar store, which can be indexed like a list of tracks represented as dictionary each
+    """
+    # The track id is always needed to split the rows into tracks
+    usecols = None if columns is None else list(dict.fromkeys(["trackId", *columns]))
+
+    # Columns with semicolon separated lists are read as strings and split in bulk afterwards
+    read_dtypes = {column: str for column in SEMI_COLON_LIST_COLUMNS}
+    if dtype is not None:
+        # Find the floating point columns on the first rows to read them directly with the requested type
+        sample = pandas.read_csv(tracks_file, usecols=usecols, dtype=read_dtypes, nrows=100)
+        read_dtypes.update({column: dtype for column in sample.columns if sample[column].dtype == np.float64})
+    with instrumentation.timer("read_csv"):
+        if selection is None:
+            raw_tracks = pandas.read_csv(tracks_file, usecols=usecols, dtype=read_dtypes)
+        else:
+            raw_tracks = selection.read_csv(tracks_file, usecols=usecols, dtype=read_dtypes)
+    instrumentation.count("rows_parsed", len(raw_tracks))
+
+    float_dtype = np.dtype(dtype if dtype is not None else np.float64)
+    columns = {}
+    for column in list(raw_tracks.columns):
+        if column in SEMI_COLON_LIST_COLUMNS:
+            columns[column] = parse_semi_colon_list_column(raw_tracks.pop(column), N_MAX_OVERLAPPING_LANELETS)
+            columns[column] = columns[column].astype(float_dtype, copy=False)
+        else:
+            columns[column] = raw_tracks.pop(column).to_numpy()
+    del raw_tracks
+
+    # Store every column as a single array sorted by the track id
+    tracks = RecordingStore(columns)
+    add_derived_columns(tracks, recording_meta, include_px_coordinates)
+    return tracks
+
+
+def add_derived_columns(tracks: "RecordingStore", recording_meta: dict, include_px_coordinates: bool=False):
+    """
+    Add the fields derived from the columns of the tracks file (e.g. center and bbox) to a store. The derived fields
+    are calculated lazily on first access. Fields, whose input columns are not loaded, are skipped.
+    :param tracks: Store of the tracks of a recording
+    :param recording_meta: Loaded meta of the corresponding recording
+    :param include_px_coordinates: Set to true, if the tracks are used for the visualizer
+    """
+    columns = tracks.columns
     ortho_px_to_meter = recording_meta["orthoPxToMeter"]
 
-    # Convert groups of rows to tracks
-    tracks = []
-    for track_id, track_rows in raw_tracks:
-        track = track_rows.to_dict(orient="list")
+    def has_columns(*names):
+        return all(name in columns for name in names)
+
+    if has_columns("xCenter", "yCenter"):
+        tracks.set_derived_column("center", stack_columns, ["xCenter", "yCenter"])
+
+    has_bbox = None
+    if has_columns("xCenter", "yCenter", "length", "width", "heading"):
+        # Only calculate bounding boxes of objects with a width and length (e.g. cars)
+        has_bbox = tracks.track_any(columns["length"] != 0) & tracks.track_any(columns["width"] != 0)
+        tracks.set_derived_column("bbox", get_rotated_bbox_from_degrees,
+                                  ["xCenter", "yCenter", "length", "width", "heading"], has_bbox, batched=True)
+
+    if include_px_coordinates:
+        # As the tracks are given in utm coordinates, transform these to pixel coordinates for visualization
+        if has_columns("xCenter"):
+            tracks.set_derived_column("xCenterVis", scale_column, ["xCenter"], factor=1 / ortho_px_to_meter)
+        if has_columns("yCenter"):
+            tracks.set_derived_column("yCenterVis", scale_column, ["yCenter"], factor=-1 / ortho_px_to_meter)
+        if has_columns("xCenter", "yCenter"):
+            tracks.set_derived_column("centerVis", stack_columns, ["xCenterVis", "yCenterVis"])
+        if has_columns("width"):
+            tracks.set_derived_column("widthVis", scale_column, ["width"], factor=1 / ortho_px_to_meter)
+        if has_columns("length"):
+            tracks.set_derived_column("lengthVis", scale_column, ["length"], factor=1 / ortho_px_to_meter)
+        if has_columns("heading"):
+            tracks.set_derived_column("headingVis", mirror_heading, ["heading"])
+        if has_bbox is not None:
+            # Single precision is sufficient for pixel coordinates and halves the memory of the bboxes
+            tracks.set_derived_column("bboxVis", get_rotated_bbox_from_degrees,
+                                      ["xCenterVis", "yCenterVis", "lengthVis", "widthVis", "headingVis"], has_bbox,
+                                      batched=True, dtype=np.float32)
+
+
+def stack_columns(*values: np.ndarray) -> np.ndarray:
+    return np.stack(values, axis=-1)
+
+
+def scale_column(values: np.ndarray, factor: float) -> np.ndarray:
+    return values * factor
+
+
+def mirror_heading(heading: np.ndarray) -> np.ndarray:
+    """
+    Mirror headings (deg) at the x-axis, as the y-axis of images points downwards
+    """
+    mirrored_heading = heading * -1
+    mirrored_heading[mirrored_heading < 0] += 360
+    return mirrored_heading
+
+
+def get_rotated_bbox_from_degrees(x_center: np.ndarray, y_center: np.ndarray, length: np.ndarray, width: np.ndarray,
+                                  heading: np.ndarray, dtype: Optional[np.dtype] = None) -> np.ndarray:
+    """
+    Calculate the rotated bbox like get_rotated_bbox, but for a heading given in degrees. By default, the bbox is
+    calculated in the precision of the center coordinates.
+    """
+    return get_rotated_bbox(x_center, y_center, length, width, np.deg2rad(heading),
+                            dtype=dtype if dtype is not None else x_center.dtype)
+
+
+class TrackSelection(object):
+    """
+    Selection of tracks and frames of a recording. The selection is evaluated on the tracks meta, which allows to
+    determine the rows of the selected tracks in the tracks file without parsing it, as the tracks files are ordered
+    by track id and frame.
+    """
+    # Number of rows per chunk when scanning a whole tracks file
+    CHUNK_SIZE = 100000
+
+    def __init__(self, tracks_meta: List[dict], classes: Optional[List[str]] = None,
+                 track_ids: Optional[List[int]] = None, frame_range: Optional[Tuple[int, int]] = None):
+        """
+        :param tracks_meta: Tracks meta of all tracks of the recording sorted by track id
+        :param classes: Only select tracks of these classes
+        :param track_ids: Only select tracks with these ids
+        :param frame_range: Only select the frames within this range given as (first frame, last frame)
+        """
+        classes = set(classes) if classes is not None else None
+        track_ids = set(track_ids) if track_ids is not None else None
 
-        # Convert lists to numpy arrays
-        for key, value in track.items():
-            if key in ["trackId", "recordingId"]:
-                track[key] = value[0]
-            elif key in ["leftAlongsideId", "rightAlongsideId"]:
+        # Tracks meta of the selected tracks with frames clipped to the frame range
+        self.tracks_meta = []
+        first_rows = []
+        num_rows = 0
+        for track_meta in tracks_meta:
+            track_initial_frame, initial_frame, final_frame = track_meta["initialFrame"], track_meta["initialFrame"], \
+                track_meta["finalFrame"]
+            first_row = num_rows
+            num_rows += final_frame - initial_frame + 1
+
+            if classes is not None and track_meta["class"] not in classes:
+                continue
+            if track_ids is not None and track_meta["trackId"] not in track_ids:
                 continue
-            else:
-                track[key] = np.array(value)
-
-        track["center"] = np.stack([track["xCenter"], track["yCenter"]], axis=-1)
-        if np.count_nonzero(track["length"]) and np.count_nonzero(track["width"]):
-            # Only calculate bounding box of objects with a width and length (e.g. cars)
-            track["bbox"] = get_rotated_bbox(track["xCenter"], track["yCenter"],
-                                             track["length"], track["width"],
-                                             np.deg2rad(track["heading"]))
+            if frame_range is not None:
+                initial_frame, final_frame = max(initial_frame, frame_range[0]), min(final_frame, frame_range[1])
+                if initial_frame > final_frame:
+                    continue
+                track_meta = dict(track_meta, initialFrame=initial_frame, finalFrame=final_frame,
+                                  numFrames=final_frame - initial_frame + 1)
+            self.tracks_meta.append(track_meta)
+            first_rows.append(first_row + initial_frame - track_initial_frame)
+
+        self.track_ids = np.array([track_meta["trackId"] for track_meta in self.tracks_meta], dtype=np.int64)
+        self.initial_frames = np.array([track_meta["initialFrame"] for track_meta in self.tracks_meta], dtype=np.int64)
+        self.final_frames = np.array([track_meta["finalFrame"] for track_meta in self.tracks_meta], dtype=np.int64)
+
+        # Rows of the selected frames in the tracks file
+        num_selected_rows = self.final_frames - self.initial_frames + 1
+        run_offsets = np.cumsum(num_selected_rows) - num_selected_rows
+        self.rows = np.repeat(np.array(first_rows, dtype=np.int64) - run_offsets, num_selected_rows) + \
+            np.arange(num_selected_rows.sum())
+
+    def row_mask(self, track_ids: np.ndarray, frames: np.ndarray) -> np.ndarray:
+        """
+        Check which rows belong to the selection
+        :param track_ids: Track ids of the rows
+        :param frames: Frames of the rows
+        :return: Boolean mask of the selected rows
+        """
+        if not len(self.track_ids):
+            return np.zeros(len(track_ids), dtype=bool)
+        i = np.clip(np.searchsorted(self.track_ids, track_ids), 0, len(self.track_ids) - 1)
+        return (self.track_ids[i] == track_ids) & (self.initial_frames[i] <= frames) & (frames <= self.final_frames[i])
+
+    def read_csv(self, tracks_file: str, usecols: Optional[List[str]] = None, **read_options) -> pandas.DataFrame:
+        """
+        Read the selected rows of a tracks file. If the file is not ordered as given by the tracks meta, the whole
+        file is scanned in chunks instead.
+        :param tracks_file: Path of a tracks csv file
+        :param usecols: Columns to read. By default, all columns are read
+        :param read_options: Further options passed to pandas.read_csv
+        :return: Data frame of the selected rows
+        """
+        # The track id and frame are needed to check the read rows
+        read_usecols = None if usecols is None else list(dict.fromkeys([*usecols, "trackId", "frame"]))
+        try:
+            raw_tracks = read_csv_rows(tracks_file, self.rows, usecols=read_usecols, **read_options)
+        except IndexError:
+            raw_tracks = None
+        if raw_tracks is None or len(raw_tracks) != len(self.rows) or \
+                not np.all(self.row_mask(raw_tracks["trackId"].to_numpy(), raw_tracks["frame"].to_numpy())):
+            logger.warning("The tracks file {} is not ordered as given by the tracks meta. Scanning the whole file.",
+                           tracks_file)
+            chunks = pandas.read_csv(tracks_file, usecols=read_usecols, chunksize=self.CHUNK_SIZE, **read_options)
+            raw_tracks = pandas.concat([chunk[self.row_mask(chunk["trackId"].to_numpy(), chunk["frame"].to_numpy())]
+                                        for chunk in chunks], ignore_index=True)
+        if usecols is not None:
+            raw_tracks = raw_tracks[[column for column in raw_tracks.columns if column in usecols]]
+        return raw_tracks
+
+
+def read_csv_rows(csv_file: str, rows: np.ndarray, **read_options) -> pandas.DataFrame:
+    """
+    Read only some rows of a csv file. Instead of parsing the whole file, the line breaks are searched on the raw
+    bytes and only the lines of the rows are passed to the csv parser.
+    :param csv_file: Path of a csv file with a header line
+    :param rows: Sorted indices of the rows to read (not counting the header)
+    :param read_options: Further options passed to pandas.read_csv
+    :return: Data frame of the rows
+    """
+    data = np.memmap(csv_file, dtype=np.uint8, mode="r")
+
+    # Find the end of every line in blocks to limit the memory needed for the comparison
+    block_size = 1 << 26
+    line_ends = np.concatenate([np.flatnonzero(data[i:i + block_size] == ord("\n")) + i + 1
+                                for i in range(0, len(data), block_size)] + [np.empty(0, dtype=np.int64)])
+    if len(data) and data[-1] != ord("\n"):
+        line_ends = np.append(line_ends, len(data))
+    line_starts = np.concatenate([[0], line_ends[:-1]])
+
+    # Merge consecutive rows to runs of lines and join them with the header line. Line 0 is the header.
+    lines = [data[:line_ends[0]].tobytes()]
+    if len(rows):
+        if rows[-1] + 1 >= len(line_ends):
+            raise IndexError("Row {} exceeds the number of rows of {}".format(rows[-1], csv_file))
+        run_breaks = np.flatnonzero(np.diff(rows) != 1) + 1
+        run_first_rows = rows[np.concatenate([[0], run_breaks])]
+        run_last_rows = rows[np.concatenate([run_breaks - 1, [len(rows) - 1]])]
+        for first_row, last_row in zip(run_first_rows, run_last_rows):
+            lines.append(data[line_starts[first_row + 1]:line_ends[last_row + 1]].tobytes())
+    lines = [line if line.endswith(b"\n") else line + b"\n" for line in lines]
+    del data
+    return pandas.read_csv(io.BytesIO(b"".join(lines)), **read_options)
+
+
+class RecordingStore(Sequence):
+    """
+    Columnar storage of all tracks of a recording. Every column is kept as one contiguous array sorted by the track
+    id, and the rows of each track are given by per-track offsets. Indexing the store like a list of tracks returns
+    a dictionary-like view of a track, whose fields are zero-copy slices of the columns.
+    """
+    # Columns, which are constant for a track and therefore are returned as scalars
+    SCALAR_COLUMNS = ("trackId", "recordingId")
+
+    def __init__(self, columns: Dict[str, np.ndarray]):
+        """
+        :param columns: Dictionary of columns with one entry per row. Has to contain the column "trackId"
+        """
+        track_ids = columns["trackId"]
+        if np.any(track_ids[1:] < track_ids[:-1]):
+            # A stable sort keeps the rows of each track in their original (frame) order
+            order = np.argsort(track_ids, kind="stable")
+            columns = {column: values[order] for column, values in columns.items()}
+            track_ids = columns["trackId"]
+        self.columns = dict(columns)
+
+        track_starts = np.flatnonzero(np.diff(track_ids)) + 1
+        self.offsets = np.concatenate([[0], track_starts, [len(track_ids)]]).astype(np.int64) if len(track_ids) \
+            else np.zeros(1, dtype=np.int64)
+        self.track_ids = track_ids[self.offsets[:-1]]
+
+        # Masks of columns, which are only given (i.e. not None) for some of the tracks
+        self.track_masks = {}
+        # Columns, which are calculated from other columns on first access
+        self.derived_columns = {}
+        self._tracks = [None] * len(self.track_ids)
+        self._frame_index = None
+        self._track_id_to_index = None
+
+    def __len__(self) -> int:
+        return len(self.track_ids)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Size of the stored columns in bytes. Memory-mapped columns of the cache are included.
+        """
+        return sum(values.nbytes for values in self.columns.values())
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        track = self._tracks[index]
+        if track is None:
+            track = Track(self, index % len(self))
+            self._tracks[index] = track
+        return track
+
+    def set_column(self, column: str, values: np.ndarray, track_mask: np.ndarray = None):
+        """
+        Add a column to the store
+        :param column: Name of the column
+        :param values: Values of the column for all rows of the recording
+        :param track_mask: Optional boolean mask [num_tracks]. For tracks not in the mask, the field is None
+        """
+        self.columns[column] = values
+        if track_mask is not None:
+            self.track_masks[column] = track_mask
         else:
-            track["bbox"] = None
-
-        if include_px_coordinates:
-            # As the tracks are given in utm coordinates, transform these to pixel coordinates for visualization
-            track["xCenterVis"] = track["xCenter"] / ortho_px_to_meter
-            track["yCenterVis"] = -track["yCenter"] / ortho_px_to_meter
-            track["centerVis"] = np.stack([track["xCenterVis"], track["yCenterVis"]], axis=-1)
-            track["widthVis"] = track["width"] / ortho_px_to_meter
-            track["lengthVis"] = track["length"] / ortho_px_to_meter
-            track["headingVis"] = track["heading"] * -1
-            track["headingVis"][track["headingVis"] < 0] += 360
-            if np.count_nonzero(track["length"]) and np.count_nonzero(track["width"]):
-                # Only calculate bounding box of objects with a width and length (e.g. cars)
-                track["bboxVis"] = get_rotated_bbox(track["xCenterVis"], track["yCenterVis"],
-                                                    track["lengthVis"], track["widthVis"],
-                                                    np.deg2rad(track["headingVis"]))
-            else:
-                track["bboxVis"] = None
-
-        tracks.append(track)
-    return tracks
+            self.track_masks.pop(column, None)
+
+    def set_derived_column(self, column: str, function: Callable[..., np.ndarray], inputs: List[str],
+                           track_mask: np.ndarray = None, batched: bool = False, **kwargs):
+        """
+        Add a column to the store, which is calculated from other columns on first access. Accessing the field of a
+        single track only calculates the values for this track, unless the column is batched.
+        :param column: Name of the column
+        :param function: Function calculating the values of the column from the values of the inputs. Needs to be
+                         defined on module level, so that the store can be pickled
+        :param inputs: Names of the input columns, which may be derived columns as well
+        :param track_mask: Optional boolean mask [num_tracks]. For tracks not in the mask, the field is None
+        :param batched: Calculate the column for all tracks at once on first access of any track. The fields of the
+                        tracks are then views of a single array
+        :param kwargs: Further keyword arguments passed to the function
+        """
+        self.columns.pop(column, None)
+        self.derived_columns[column] = DerivedColumn(function, inputs, track_mask, batched, kwargs)
+
+    def column(self, column: str) -> np.ndarray:
+        """
+        Get the values of a column for all tracks. Derived columns are calculated for all tracks at once and stored.
+        :param column: Name of the column
+        :return: Values of the column for all rows of the recording
+        """
+        if column not in self.columns:
+            derived_column = self.derived_columns[column]
+            values = derived_column.function(*(self.column(name) for name in derived_column.inputs),
+                                             **derived_column.kwargs)
+            self.set_column(column, values, derived_column.track_mask)
+        return self.columns[column]
+
+    def track_any(self, row_mask: np.ndarray) -> np.ndarray:
+        """
+        Reduce a boolean mask of all rows to a mask of all tracks, which contain at least one true row
+        :param row_mask: Boolean mask [num_rows]
+        :return: Boolean mask [num_tracks]
+        """
+        if not len(self):
+            return np.zeros(0, dtype=bool)
+        return np.add.reduceat(row_mask.astype(np.int64), self.offsets[:-1]) > 0
+
+    def track_field(self, index: int, column: str):
+        """
+        Get the field of a single track
+        :param index: Index of the track in the store
+        :param column: Name of the column
+        :return: A scalar for the SCALAR_COLUMNS, None if the field is not given for the track or a view of the rows
+        """
+        values = self.columns[column]
+        if column in self.SCALAR_COLUMNS:
+            return values[self.offsets[index]].item()
+        track_mask = self.track_masks.get(column)
+        if track_mask is not None and not track_mask[index]:
+            return None
+        return values[self.offsets[index]:self.offsets[index + 1]]
+
+    def frame_index(self) -> "FrameIndex":
+        """
+        Get the frame-major index of the store, which is created on first use.
+        """
+        if self._frame_index is None:
+            self._frame_index = FrameIndex(self)
+        return self._frame_index
+
+    def index_of(self, track_id: int) -> Optional[int]:
+        """
+        Get the index of a track in the store by its id. The mapping of the ids is created on first use.
+        :param track_id: Id of the track
+        :return: Index of the track or None, if the store contains no track with this id
+        """
+        if self._track_id_to_index is None:
+            self._track_id_to_index = {track_id: index for index, track_id in enumerate(self.track_ids.tolist())}
+        return self._track_id_to_index.get(int(track_id))
+
+
+class FrameIndex(object):
+    """
+    Frame-major index of the rows of a RecordingStore. The rows are sorted by frame (and by track within a frame) and
+    the rows of each frame are given by per-frame offsets. This allows to get the state of all objects at a frame as
+    array slices without iterating over the tracks.
+    """
+
+    def __init__(self, tracks: RecordingStore):
+        """
+        :param tracks: Store of the tracks of a recording. Has to contain the column "frame"
+        """
+        self.tracks = tracks
+        frames = tracks.columns["frame"]
+
+        # As the store is sorted by track, a stable sort keeps the rows of a frame in the order of the tracks
+        self.order = np.argsort(frames, kind="stable")
+        sorted_frames = frames[self.order]
+        self.minimum_frame = int(sorted_frames[0]) if len(sorted_frames) else 0
+        self.maximum_frame = int(sorted_frames[-1]) if len(sorted_frames) else -1
+        self.offsets = np.searchsorted(sorted_frames, np.arange(self.minimum_frame, self.maximum_frame + 2))
+
+        # Index of the track in the store for every row in frame-major order
+        row_track_indices = np.repeat(np.arange(len(tracks)), np.diff(tracks.offsets))
+        self.track_indices = row_track_indices[self.order]
+        self._columns = {}
+
+    def column(self, column: str) -> np.ndarray:
+        """
+        Get the values of a column for all rows in frame-major order. The sorted column is created on first use.
+        :param column: Name of the column, which may be a derived column
+        :return: Values of the column sorted by frame
+        """
+        if column not in self._columns:
+            self._columns[column] = self.tracks.column(column)[self.order]
+        return self._columns[column]
+
+    def frame_rows(self, frame: int) -> slice:
+        """
+        Get the rows of a frame in frame-major order
+        :param frame: Frame number
+        :return: Slice of the rows of the frame. Empty, if the frame is not part of the recording
+        """
+        if not self.minimum_frame <= frame <= self.maximum_frame:
+            return slice(0, 0)
+        i = frame - self.minimum_frame
+        return slice(self.offsets[i], self.offsets[i + 1])
+
+    def scene_at(self, frame: int) -> "Scene":
+        """
+        Get the state of all objects at a frame
+        :param frame: Frame number
+        :return: Dictionary-like view of all columns at the frame with one row per object
+        """
+        return Scene(self, frame, self.frame_rows(frame))
+
+    def scenes(self, frame_range: Optional[Tuple[int, int]] = None, step: int = 1) -> Iterator["Scene"]:
+        """
+        Iterate over the state of all objects for a range of frames
+        :param frame_range: Range of frames given as (first frame, last frame). By default, all frames are used
+        :param step: Only use every nth frame
+        :return: Generator of scenes
+        """
+        first_frame, last_frame = frame_range if frame_range is not None else (self.minimum_frame, self.maximum_frame)
+        for frame in range(first_frame, last_frame + 1, step):
+            yield self.scene_at(frame)
+
+
+class Scene(Mapping):
+    """
+    Dictionary-like view of all objects at a single frame. Every field is a slice of a frame-major column with one
+    row per object, and the field "trackIndex" contains the index of each object's track in the RecordingStore.
+    """
+
+    def __init__(self, frame_index: FrameIndex, frame: int, rows: slice):
+        self.frame = frame
+        self.rows = rows
+        self._frame_index = frame_index
+
+    def __getitem__(self, key):
+        if key == "trackIndex":
+            return self._frame_index.track_indices[self.rows]
+        tracks = self._frame_index.tracks
+        if key not in tracks.columns and key not in tracks.derived_columns:
+            raise KeyError(key)
+        return self._frame_index.column(key)[self.rows]
+
+    def __contains__(self, key) -> bool:
+        tracks = self._frame_index.tracks
+        return key == "trackIndex" or key in tracks.columns or key in tracks.derived_columns
+
+    def __iter__(self):
+        tracks = self._frame_index.tracks
+        return iter(list(dict.fromkeys(["trackIndex", *tracks.columns, *tracks.derived_columns])))
+
+    def __len__(self) -> int:
+        return len(list(iter(self)))
+
+
+class TrackIntervalIndex(object):
+    """
+    Index of the tracks present at each frame, which is built from the initial and final frames of the tracks meta.
+    The indices of the tracks are stored in compressed sparse row form: the tracks of a frame are given by
+    indices[offsets[i]:offsets[i + 1]] with i = frame - minimum_frame.
+    """
+
+    def __init__(self, tracks_meta: List[dict]):
+        """
+        :param tracks_meta: Loaded tracks meta of a recording
+        """
+        initial_frames = np.array([track_meta["initialFrame"] for track_meta in tracks_meta], dtype=np.int64)
+        final_frames = np.array([track_meta["finalFrame"] for track_meta in tracks_meta], dtype=np.int64)
+        self.minimum_frame = int(initial_frames.min()) if len(tracks_meta) else 0
+        self.maximum_frame = int(final_frames.max()) if len(tracks_meta) else -1
+        num_frames = self.maximum_frame - self.minimum_frame + 1
+
+        # Sweep over the start and end events of the tracks: the number of tracks at a frame is the number of tracks
+        # started minus the number of tracks ended before it
+        events = np.bincount(initial_frames - self.minimum_frame, minlength=num_frames + 1) - \
+            np.bincount(final_frames - self.minimum_frame + 1, minlength=num_frames + 1)
+        self.offsets = np.zeros(num_frames + 1, dtype=np.int64)
+        np.cumsum(np.cumsum(events[:-1]), out=self.offsets[1:])
+
+        # Enumerate the frames of all tracks and sort them by frame. The stable sort keeps the tracks of a frame in the
+        # order of the tracks meta
+        lengths = final_frames - initial_frames + 1
+        track_indices = np.repeat(np.arange(len(tracks_meta)), lengths)
+        frames = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths - initial_frames, lengths)
+        self.indices = track_indices[np.argsort(frames, kind="stable")]
+
+    def __getitem__(self, frame: int) -> np.ndarray:
+        """
+        Get the indices of the tracks present at a frame
+        :param frame: Frame number
+        :return: Indices of the tracks in the order of the tracks meta. Empty, if the frame is not part of the recording
+        """
+        if not self.minimum_frame <= frame <= self.maximum_frame:
+            return self.indices[:0]
+        i = frame - self.minimum_frame
+        return self.indices[self.offsets[i]:self.offsets[i + 1]]
+
+
+class DerivedColumn(object):
+    """
+    Definition of a column, which is calculated from other columns of a RecordingStore.
+    """
+
+    def __init__(self, function: Callable[..., np.ndarray], inputs: List[str], track_mask: Optional[np.ndarray],
+                 batched: bool, kwargs: dict):
+        self.function = function
+        self.inputs = inputs
+        self.track_mask = track_mask
+        self.batched = batched
+        self.kwargs = kwargs
+
+
+class Track(Mapping):
+    """
+    Dictionary-like view of a single track of a RecordingStore. Derived fields are calculated on first access and
+    memoized for this track. Fields assigned to the view are only stored for this track and do not alter the store.
+    """
+
+    def __init__(self, store: RecordingStore, index: int):
+        self._store = store
+        self._index = index
+        self._fields = {}
+        self._derived_fields = {}
+
+    def __getitem__(self, key):
+        if key in self._fields:
+            return self._fields[key]
+        if key in self._store.columns:
+            return self._store.track_field(self._index, key)
+        if key in self._derived_fields:
+            return self._derived_fields[key]
+
+        derived_column = self._store.derived_columns.get(key)
+        if derived_column is None:
+            raise KeyError(key)
+        if derived_column.batched:
+            self._store.column(key)
+            return self._store.track_field(self._index, key)
+        if derived_column.track_mask is not None and not derived_column.track_mask[self._index]:
+            value = None
+        else:
+            value = derived_column.function(*(self[name] for name in derived_column.inputs), **derived_column.kwargs)
+        self._derived_fields[key] = value
+        return value
+
+    def __setitem__(self, key, value):
+        self._fields[key] = value
+
+    def __contains__(self, key) -> bool:
+        # Check the keys without calculating derived fields
+        return key in self._fields or key in self._store.columns or key in self._store.derived_columns
+
+    def __iter__(self):
+        return iter(self._keys())
+
+    def __len__(self) -> int:
+        return len(self._keys())
+
+    def _keys(self) -> List[str]:
+        return list(dict.fromkeys([*self._store.columns, *self._store.derived_columns, *self._fields]))
+
+
+class TracksCache(object):
+    """
+    On-disk cache of parsed tracks. Every entry is a directory containing one .npy file per column of a RecordingStore,
+    which is memory-mapped when loading. Entries are identified by a fingerprint of the tracks file (size,
+    modification time and content hash) and the parsing options, so that modified files never hit stale entries.
+    If the cache exceeds its maximum size, the least recently used entries are removed. Derived columns are not cached,
+    as they are calculated lazily after loading.
+    """
+    DEFAULT_DIRECTORY = ".tracks_cache"
+    DEFAULT_MAX_SIZE = 8 * 1024 ** 3
+    # Increase the version if the layout of the cached data changes to invalidate all existing entries
+    VERSION = 2
+    MANIFEST_FILE = "manifest.json"
+
+    def __init__(self, cache_dir: str, max_size: int = DEFAULT_MAX_SIZE):
+        """
+        :param cache_dir: Directory of the cache
+        :param max_size: Maximum size of all cache entries in bytes
+        """
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+
+    def get_key(self, tracks_file: str, options: dict) -> str:
+        """
+        Create the key of a cache entry from the fingerprint of the tracks file and the parsing options
+        :param tracks_file: Path of a tracks csv file
+        :param options: Parsing options, which affect the parsed tracks
+        :return: Key of the cache entry
+        """
+        file_stat = os.stat(tracks_file)
+        content_hash = hashlib.blake2b(digest_size=16)
+        with open(tracks_file, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                content_hash.update(chunk)
+        fingerprint = {"version": self.VERSION, "size": file_stat.st_size, "mtime": file_stat.st_mtime_ns,
+                       "hash": content_hash.hexdigest(), "options": options}
+        return hashlib.blake2b(json.dumps(fingerprint, sort_keys=True).encode(), digest_size=16).hexdigest()
+
+    def load(self, key: str) -> Optional[RecordingStore]:
+        """
+        Load the tracks of a cache entry
+        :param key: Key of the cache entry
+        :return: The cached tracks or None, if there is no valid entry for the key
+        """
+        entry_dir = os.path.join(self.cache_dir, key)
+        manifest_file = os.path.join(entry_dir, self.MANIFEST_FILE)
+        if not os.path.exists(manifest_file):
+            return None
+        try:
+            with open(manifest_file) as f:
+                manifest = json.load(f)
+            # Copy-on-write, so that the loaded tracks can be modified like parsed ones without changing the cache
+            columns = {column: np.load(os.path.join(entry_dir, file_name), mmap_mode="c")
+                       for column, file_name in manifest["columns"].items()}
+            tracks = RecordingStore(columns)
+            for column, file_name in manifest["track_masks"].items():
+                tracks.set_column(column, columns[column], np.load(os.path.join(entry_dir, file_name)))
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Could not load cached tracks from {}: {}", entry_dir, e)
+            return None
+
+        # Mark the entry as recently used
+        os.utime(manifest_file)
+        logger.info("Loaded cached tracks of {} from {}", manifest["source"], entry_dir)
+        return tracks
+
+    def save(self, key: str, tracks_file: str, options: dict, tracks: RecordingStore):
+        """
+        Store tracks as cache entry. Outdated entries of the same tracks file and options are removed.
+        :param key: Key of the cache entry
+        :param tracks_file: Path of the tracks csv file, from which the tracks were parsed
+        :param options: Parsing options, which were used to parse the tracks
+        :param tracks: The parsed tracks
+        """
+        columns = {column: values for column, values in tracks.columns.items() if column not in tracks.derived_columns}
+        track_masks = {column: track_mask for column, track_mask in tracks.track_masks.items() if column in columns}
+        if any(values.dtype == object for values in columns.values()):
+            logger.warning("Tracks of {} contain non-numeric columns and are not cached.", tracks_file)
+            return
+        entry_size = sum(values.nbytes for values in columns.values())
+        if entry_size > self.max_size:
+            logger.warning("Tracks of {} exceed the maximum cache size and are not cached.", tracks_file)
+            return
+
+        source = os.path.abspath(tracks_file)
+        entry_dir = os.path.join(self.cache_dir, key)
+        temporary_dir = "{}.tmp{}".format(entry_dir, os.getpid())
+        try:
+            os.makedirs(temporary_dir, exist_ok=True)
+            manifest = {"source": source, "options": options, "columns": {}, "track_masks": {}}
+            for i, (column, values) in enumerate(columns.items()):
+                manifest["columns"][column] = "column{}.npy".format(i)
+                np.save(os.path.join(temporary_dir, manifest["columns"][column]), values)
+            for i, (column, track_mask) in enumerate(track_masks.items()):
+                manifest["track_masks"][column] = "mask{}.npy".format(i)
+                np.save(os.path.join(temporary_dir, manifest["track_masks"][column]), track_mask)
+            # Write the manifest last, as it marks the entry as complete
+            with open(os.path.join(temporary_dir, self.MANIFEST_FILE), "w") as f:
+                json.dump(manifest, f)
+            os.replace(temporary_dir, entry_dir)
+        except OSError as e:
+            logger.warning("Could not cache tracks of {} in {}: {}", tracks_file, entry_dir, e)
+            shutil.rmtree(temporary_dir, ignore_errors=True)
+            return
+
+        for other_key, manifest in self._read_manifests().items():
+            if other_key != key and manifest["source"] == source and manifest["options"] == options:
+                logger.info("Removing outdated cached tracks of {} from {}", source, self.cache_dir)
+                shutil.rmtree(os.path.join(self.cache_dir, other_key), ignore_errors=True)
+        self.evict()
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the cache does not exceed its maximum size.
+        """
+        entries = []
+        for key in self._read_manifests():
+            entry_dir = os.path.join(self.cache_dir, key)
+            last_used = os.path.getmtime(os.path.join(entry_dir, self.MANIFEST_FILE))
+            size = sum(entry.stat().st_size for entry in os.scandir(entry_dir))
+            entries.append((last_used, size, entry_dir))
+
+        cache_size = sum(size for _, size, _ in entries)
+        for _, size, entry_dir in sorted(entries):
+            if cache_size <= self.max_size:
+                break
+            logger.info("Removing least recently used cached tracks from {}", entry_dir)
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            cache_size -= size
+
+    def _read_manifests(self) -> Dict[str, dict]:
+        manifests = {}
+        if not os.path.isdir(self.cache_dir):
+            return manifests
+        for entry in os.scandir(self.cache_dir):
+            try:
+                with open(os.path.join(entry.path, self.MANIFEST_FILE)) as f:
+                    manifests[entry.name] = json.load(f)
+            except (OSError, ValueError):
+                continue
+        return manifests
+
+
+def parse_semi_colon_list_column(values: pandas.Series, n_max_entries: int = N_MAX_OVERLAPPING_LANELETS) -> np.ndarray:
+    """
+    Split a column of semicolon separated lists in bulk into a NaN padded array. Instead of converting every cell on
+    its own, all cells are joined into one text with a line per row, which is split and converted at once by the
+    C parser of pandas.
+    :param values: Column of strings like "12;13". Empty cells may be given as empty strings or NaN
+    :param n_max_entries: Minimum number of entries per row. Rows with fewer entries are padded with NaN
+    :return: Numpy array in the shape [num_rows, max(n_max_entries, maximum number of entries in a row)]
+    """
+    cells = pandas.Series(values, dtype=object).fillna("").astype(str).tolist()
+    if not cells:
+        return np.empty((0, n_max_entries))
+    text = "\n".join(cells) + "\n"
+
+    # Count the separators of every row on the raw bytes to find the number of needed columns
+    characters = np.frombuffer(text.encode(), dtype=np.uint8)
+    row_of_character = np.cumsum(characters == ord("\n"))
+    num_separators = np.bincount(row_of_character[characters == ord(";")], minlength=len(cells))
+    num_columns = max(n_max_entries, int(num_separators.max()) + 1)
+
+    return pandas.read_csv(io.StringIO(text), sep=";", header=None, names=range(num_columns),
+                           skip_blank_lines=False, dtype=np.float64).to_numpy()
 
 
 def read_tracks_meta(tracks_meta_file: str) -> List[dict]:
@@ -148,25 +975,33 @@ def read_recording_meta(recording_meta_file: str) -> dict:
     return pandas.read_csv(recording_meta_file).to_dict(orient="records")[0]
 
 
+@timed("rotated_bbox")
 def get_rotated_bbox(x_center: np.ndarray, y_center: np.ndarray,
-                     length: np.ndarray, width: np.ndarray, heading: np.ndarray) -> np.ndarray:
+                     length: np.ndarray, width: np.ndarray, heading: np.ndarray,
+                     out: Optional[np.ndarray] = None, dtype: Optional[np.dtype] = None) -> np.ndarray:
     """
     Calculate the corners of a rotated bbox from the position, shape and heading for every timestamp.
+    As the calculation is vectorized over all timestamps, the bboxes of all rows of a recording (or of the
+    concatenated rows of several recordings) should be calculated in one call.
 
     :param x_center: x coordinates of the object center positions [num_timesteps]
     :param y_center: y coordinates of the object center positions [num_timesteps]
     :param length: objects lengths [num_timesteps]
     :param width: object widths [num_timesteps]
     :param heading: object heading (rad) [num_timesteps]
+    :param out: Optional preallocated output array in the shape [num_timesteps, 4, 2]
+    :param dtype: Data type of the calculation (e.g. np.float32), if no output array is given. Default: np.float64
     :return: Numpy array in the shape [num_timesteps, 4 (corners), 2 (dimensions)]
     """
-    centroids = np.column_stack([x_center, y_center])
+    if out is None:
+        out = np.empty((len(x_center), 4, 2), dtype=dtype if dtype is not None else np.float64)
+    dtype = out.dtype
 
     # Precalculate all components needed for the corner calculation
-    l = length / 2
-    w = width / 2
-    c = np.cos(heading)
-    s = np.sin(heading)
+    l = np.multiply(length, 0.5, dtype=dtype)
+    w = np.multiply(width, 0.5, dtype=dtype)
+    c = np.cos(heading, dtype=dtype)
+    s = np.sin(heading, dtype=dtype)
 
     lc = l * c
     ls = l * s
@@ -175,25 +1010,24 @@ def get_rotated_bbox(x_center: np.ndarray, y_center: np.ndarray,
 
     # Calculate all four rotated bbox corner positions assuming the object is located at the origin.
     # To do so, rotate the corners at [+/- length/2, +/- width/2] as given by the orientation.
-    # Use a vectorized approach using precalculated components for maximum efficiency
-    rotated_bbox_vertices = np.empty((centroids.shape[0], 4, 2))
+    # Use a vectorized approach using precalculated components for maximum efficiency. The corners are written
+    # directly into the output, as the rear corners are the negated front corners.
 
     # Front-right corner
-    rotated_bbox_vertices[:, 0, 0] = lc - ws
-    rotated_bbox_vertices[:, 0, 1] = ls + wc
+    np.subtract(lc, ws, out=out[:, 0, 0])
+    np.add(ls, wc, out=out[:, 0, 1])
+
+    # Front-left corner
+    np.add(lc, ws, out=out[:, 3, 0])
+    np.subtract(ls, wc, out=out[:, 3, 1])
 
     # Rear-right corner
-    rotated_bbox_vertices[:, 1, 0] = -lc - ws
-    rotated_bbox_vertices[:, 1, 1] = -ls + wc
+    np.negative(out[:, 3, :], out=out[:, 1, :])
 
     # Rear-left corner
-    rotated_bbox_vertices[:, 2, 0] = -lc + ws
-    rotated_bbox_vertices[:, 2, 1] = -ls - wc
-
-    # Front-left corner
-    rotated_bbox_vertices[:, 3, 0] = lc + ws
-    rotated_bbox_vertices[:, 3, 1] = ls - wc
+    np.negative(out[:, 0, :], out=out[:, 2, :])
 
     # Move corners of rotated bounding box from the origin to the object's location
-    rotated_bbox_vertices = rotated_bbox_vertices + np.expand_dims(centroids, axis=1)
-    return rotated_bbox_vertices
+    out[:, :, 0] += np.expand_dims(x_center, axis=1)
+    out[:, :, 1] += np.expand_dims(y_center, axis=1)
+    return out
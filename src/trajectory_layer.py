@@ -0,0 +1,95 @@
+import numpy as np
+from typing import Tuple
+
+# Maximum deviation of the simplified trajectories from the original ones in display coordinates. As the display
+# coordinates are given in pixels of the background image, the simplification is not visible.
+DEFAULT_TOLERANCE = 0.5
+
+
+def simplify_polyline(points: np.ndarray, tolerance: float = DEFAULT_TOLERANCE) -> np.ndarray:
+    """
+    Simplify a polyline by the Douglas-Peucker algorithm.
+    :param points: Array of shape (n, 2) containing the vertices of the polyline
+    :param tolerance: Maximum distance of the removed vertices to the simplified polyline
+    :return: Sorted indices of the kept vertices. The first and last vertex are always kept
+    """
+    num_points = len(points)
+    if num_points <= 2:
+        return np.arange(num_points)
+
+    keep = np.zeros(num_points, dtype=bool)
+    keep[[0, -1]] = True
+    # Segments are processed by a stack instead of recursion, so that long tracks do not hit the recursion limit
+    stack = [(0, num_points - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        start, direction = points[first], points[last] - points[first]
+        offsets = points[first + 1:last] - start
+        length = np.hypot(direction[0], direction[1])
+        if length > 0:
+            distances = np.abs(direction[0] * offsets[:, 1] - direction[1] * offsets[:, 0]) / length
+        else:
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        # Missing values never exceed the tolerance and are therefore removed
+        distances = np.nan_to_num(distances, nan=0.0)
+        i = int(np.argmax(distances))
+        if distances[i] > tolerance:
+            split = first + 1 + i
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return np.flatnonzero(keep)
+
+
+class TrajectoryLayer(object):
+    """
+    Simplified trajectories of all tracks of a recording, which are split into the past and future part of the current
+    frame. The simplified polyline of a track is computed on its first use and only the split point is searched per
+    frame, so that the cost of a frame depends on the number of simplified vertices instead of the track length.
+    """
+
+    def __init__(self, center_points: np.ndarray, track_offsets: np.ndarray, tolerance: float = DEFAULT_TOLERANCE):
+        """
+        :param center_points: Array of shape (n, 2) containing the center points of all rows in display coordinates
+        :param track_offsets: Offsets of the rows of each track, i.e. the rows of track i are
+                              track_offsets[i]:track_offsets[i + 1]
+        :param tolerance: Maximum deviation of the simplified trajectories in display coordinates
+        """
+        self.center_points = center_points
+        self.track_offsets = track_offsets
+        self.tolerance = tolerance
+        # Indices of the kept vertices within each track by the track idx. Assigning an entry is atomic, so the layer
+        # may be used by the background thread preparing the frames.
+        self._kept_indices = {}
+
+    def kept_indices(self, track_idx: int) -> np.ndarray:
+        """
+        Get the indices of the vertices of the simplified trajectory of a track.
+        :param track_idx: Index of the track
+        :return: Sorted indices of the kept vertices within the track
+        """
+        kept_indices = self._kept_indices.get(track_idx)
+        if kept_indices is None:
+            start, end = self.track_offsets[track_idx], self.track_offsets[track_idx + 1]
+            kept_indices = simplify_polyline(self.center_points[start:end], self.tolerance)
+            self._kept_indices[track_idx] = kept_indices
+        return kept_indices
+
+    def split(self, track_idx: int, current_index: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the past and the future part of the simplified trajectory of a track. Both parts end respectively start at
+        the current center point.
+        :param track_idx: Index of the track
+        :param current_index: Index of the current frame within the track
+        :return: Vertices of the past and the future trajectory in the shape [n, 2]
+        """
+        start = self.track_offsets[track_idx]
+        kept_indices = self.kept_indices(track_idx)
+        num_past = np.searchsorted(kept_indices, current_index)
+        num_future = np.searchsorted(kept_indices, current_index, side="right")
+        current = start + current_index
+        past = self.center_points[np.append(start + kept_indices[:num_past], current)]
+        future = self.center_points[np.insert(start + kept_indices[num_future:], 0, current)]
+        return past, future